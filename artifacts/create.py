@@ -1,13 +1,15 @@
+import re
 import sys
-import sqlite3
+from artifacts import session
 
 
-def create_schema(filename=None, db_filename=None):
+def create_schema(filename=None, db_filename=None, profile='legacy'):
     """
     creates sqlite3 database from text file containing SQL CREATE statements
     :param filename: path to text file containing SQL statements
     :param db_filename: path to the sqlite3 database
-    :return: none
+    :param profile: pragma profile of the connection, see artifacts.session.profiles
+    :return: sqlite3 connection
     """
 
     if filename is None:
@@ -19,7 +21,7 @@ def create_schema(filename=None, db_filename=None):
         sys.exit(-1)
 
     # creates new db if it does not exist, and calls cursor object
-    db = sqlite3.connect(db_filename)
+    db = session.connect(db_filename, profile)
 
     # use 'with' to cleanly close file
     with open(filename, 'r') as f:
@@ -34,3 +36,85 @@ def create_schema(filename=None, db_filename=None):
 
     return db
 
+
+
+def _read_statements(filename):
+    with open(filename, 'r') as f:
+        lines = f.readlines()
+    return [statement for statement in ''.join(lines).split('\n\n') if statement.strip()]
+
+
+def index_names(filename):
+    """
+    names of the indexes created in a text file of SQL CREATE INDEX statements
+    :param filename: path to text file containing SQL statements
+    :return: list of index names
+    """
+    p = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+    names = []
+    for statement in _read_statements(filename):
+        result = p.search(statement)
+        if result:
+            names.append(result.group(1))
+    return names
+
+
+def drop_indexes(filename, db):
+    """
+    drops secondary indexes before a bulk load, implicit indexes of UNIQUE constraints are kept
+    :param filename: path to text file containing SQL CREATE INDEX statements
+    :param db: sqlite3 connection
+    :return: none
+    """
+    for name in index_names(filename):
+        db.execute("DROP INDEX IF EXISTS {}".format(name))
+    db.commit()
+
+
+def create_indexes(filename, db, analyze=True):
+    """
+    creates secondary indexes after a bulk load and refreshes the statistics of the query planner
+    :param filename: path to text file containing SQL CREATE INDEX statements, separated by a blank line
+    :param db: sqlite3 connection
+    :param analyze: run ANALYZE once the indexes are built
+    :return: none
+    """
+    for statement in _read_statements(filename):
+        db.execute(statement)
+    if analyze:
+        db.execute("ANALYZE")
+    db.commit()
+
+
+def _trigger_statements(filename):
+    p = re.compile(r"CREATE\s+TRIGGER\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+    triggers = []
+    for statement in _read_statements(filename):
+        result = p.match(statement.strip())
+        if result:
+            triggers.append((result.group(1), statement))
+    return triggers
+
+
+def drop_triggers(filename, db):
+    """
+    drops the triggers created in a schema file before a bulk load
+    :param filename: path to text file containing SQL statements
+    :param db: sqlite3 connection
+    :return: none
+    """
+    for name, _ in _trigger_statements(filename):
+        db.execute("DROP TRIGGER IF EXISTS {}".format(name))
+    db.commit()
+
+
+def create_triggers(filename, db):
+    """
+    creates the triggers of a schema file again after a bulk load
+    :param filename: path to text file containing SQL statements
+    :param db: sqlite3 connection
+    :return: none
+    """
+    for _, statement in _trigger_statements(filename):
+        db.execute(statement)
+    db.commit()
@@ -0,0 +1,255 @@
+import os
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+from artifacts import fs
+
+"""
+process-wide cache of directory listings. the extraction walks the same day directories once for every
+forecast and evaluation test, so listings are read once and shared between Forecasts, Evaluations and Catalogs.
+directories are read with os.scandir, and every entry keeps its stat result once it was needed, so a file is
+stat'd at most once however many lookups ask for its creation time or size.
+"""
+
+
+class Entry:
+    """
+    single directory entry. whether it is a file comes from the directory scan, the stat result is read on first
+    use and kept.
+    """
+    __slots__ = ('path', 'is_file', '_stat')
+
+    def __init__(self, path, is_file):
+        self.path = path
+        self.is_file = is_file
+        self._stat = None
+
+    def stat(self):
+        """
+        :return: os.stat_result of the entry
+        :raises: FileNotFoundError if the entry was removed since the directory was read
+        """
+        if self._stat is None:
+            self._stat = fs.stat(self.path)
+        return self._stat
+
+    @property
+    def ctime(self):
+        return self.stat().st_ctime
+
+    @property
+    def size(self):
+        return self.stat().st_size
+
+
+class Listing:
+    """
+    snapshot of a single directory. names keep the order returned by the operating system, entries map every
+    name to its Entry.
+    """
+    __slots__ = ('path', 'mtime', 'names', 'files', 'entries', 'checked')
+
+    def __init__(self, path, mtime, names, files, entries=None):
+        self.path = path
+        self.mtime = mtime
+        self.names = names
+        self.files = files
+        self.entries = entries
+        self.checked = time.monotonic()
+
+
+class DirectoryCache:
+    """
+    maps directory path -> Listing with least-recently-used eviction. a cached listing is re-read when the
+    modification time of the directory changes. to avoid a stat on every lookup, listings validated less than
+    ttl seconds ago are trusted as-is.
+
+    missing directories are cached as well, and are invalidated by the modification time of their parent.
+    """
+    def __init__(self, maxsize=4096, ttl=1.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def listing(self, path):
+        """
+        returns listing for path, reading the directory only if it is not cached or has changed on disk
+        :param path: directory path
+        :return: Listing object
+        :raises: FileNotFoundError if the directory does not exist
+        """
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached is not None:
+                self._listings.move_to_end(path)
+
+        if cached is not None and self._is_valid(cached):
+            self.hits += 1
+            if cached.names is None:
+                raise FileNotFoundError(path)
+            return cached
+
+        self.misses += 1
+        listing = self._read(path)
+        with self._lock:
+            self._listings[path] = listing
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.maxsize:
+                self._listings.popitem(last=False)
+        if listing.names is None:
+            raise FileNotFoundError(path)
+        return listing
+
+    def invalidate(self, path=None):
+        """
+        drops cached listing for path, or every listing if path is None
+        :param path: directory path
+        :return: none
+        """
+        with self._lock:
+            if path is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(path, None)
+
+    def _is_valid(self, cached):
+        now = time.monotonic()
+        if now - cached.checked < self.ttl:
+            return True
+        # missing directories are validated against their parent
+        path = cached.path
+        if cached.names is None:
+            path = os.path.dirname(cached.path)
+        try:
+            mtime = fs.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != cached.mtime:
+            return False
+        cached.checked = now
+        return True
+
+    @staticmethod
+    def _read(path):
+        try:
+            mtime = fs.stat(path).st_mtime_ns
+            names = []
+            files = set()
+            entries = {}
+            with fs.scandir(path) as it:
+                for entry in it:
+                    names.append(entry.name)
+                    is_file = entry.is_file()
+                    if is_file:
+                        files.add(entry.name)
+                    entries[entry.name] = Entry(entry.path, is_file)
+            return Listing(path, mtime, tuple(names), frozenset(files), entries)
+        except (FileNotFoundError, NotADirectoryError):
+            try:
+                parent_mtime = fs.stat(os.path.dirname(path)).st_mtime_ns
+            except OSError:
+                parent_mtime = None
+            return Listing(path, parent_mtime, None, None)
+
+
+_cache = DirectoryCache()
+
+
+def listing(path):
+    """
+    cached listing of a directory, for callers that index a whole directory at once
+    :param path: directory path
+    :return: Listing object
+    :raises: FileNotFoundError if the directory does not exist
+    """
+    return _cache.listing(path)
+
+
+def listdir(path):
+    """
+    cached replacement for os.listdir
+    :param path: directory path
+    :return: tuple of names in directory
+    """
+    return _cache.listing(path).names
+
+
+def isfile(path):
+    """
+    cached replacement for os.path.isfile, answered from the listing of the parent directory
+    :param path: file path
+    :return: (bool) True if path is a file
+    """
+    dirname, name = os.path.split(path)
+    try:
+        return name in _cache.listing(dirname).files
+    except FileNotFoundError:
+        return False
+
+
+def entry(path):
+    """
+    cached directory entry of a path, found in the listing of the parent directory
+    :param path: file path
+    :return: Entry object, None if path does not exist
+    """
+    dirname, name = os.path.split(path)
+    try:
+        return _cache.listing(dirname).entries.get(name)
+    except FileNotFoundError:
+        return None
+
+
+def getctime(path):
+    """
+    cached replacement for os.path.getctime
+    :param path: file path
+    :return: creation time of path in seconds since the epoch
+    :raises: FileNotFoundError if path does not exist
+    """
+    cached = entry(path)
+    if cached is None:
+        raise FileNotFoundError(path)
+    return cached.ctime
+
+
+def glob(dirname, pattern):
+    """
+    cached replacement for glob.glob(os.path.join(dirname, pattern)) for patterns without directory components.
+    as with glob, hidden files are only matched by patterns starting with '.'
+    :param dirname: directory path
+    :param pattern: shell-style pattern
+    :return: list of matching paths, empty list if directory does not exist
+    """
+    try:
+        names = _cache.listing(dirname).names
+    except FileNotFoundError:
+        return []
+    matches = fnmatch.filter(names, pattern)
+    if not pattern.startswith('.'):
+        matches = [name for name in matches if not name.startswith('.')]
+    return [os.path.join(dirname, name) for name in matches]
+
+
+def invalidate(path=None):
+    """
+    drops cached listings, see DirectoryCache.invalidate
+    """
+    _cache.invalidate(path)
+
+
+def configure(maxsize=None, ttl=None):
+    """
+    adjusts the size and revalidation interval of the process-wide cache
+    :param maxsize: maximum number of directories held
+    :param ttl: seconds a listing is trusted before its modification time is checked again
+    :return: none
+    """
+    if maxsize is not None:
+        _cache.maxsize = maxsize
+    if ttl is not None:
+        _cache.ttl = ttl
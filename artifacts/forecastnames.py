@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from artifacts import fs
+
+"""
+persistent catalog of the forecast names found in the forecast archive of a forecast group. the archive only grows,
+so the names found in every directory are stored with the modification time of the directory, and only new or
+changed directories, usually the current month, are listed again. catalogs are kept in cache_dir, one file per
+forecast directory.
+"""
+
+name_pattern = re.compile(r'(\S*)_\d+_\d+_\d+\S*')
+
+# where catalogs are stored, None keeps them in memory only
+cache_dir = os.environ.get('CSEP_DB_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'csep_db'))
+
+# directories modified this recently are listed again on the next refresh, a file could still be added within the
+# resolution of the modification time
+racy_seconds = 2.0
+
+
+def directory_names(names):
+    """
+    forecast names of the files in one directory. a directory containing any file not named like a forecast
+    contributes no names.
+    :param names: file names in the order returned by the operating system
+    :return: list of forecast names, may contain duplicates
+    """
+    try:
+        forecast_names = [name_pattern.match(name).group(1) for name in names]
+    except AttributeError:
+        return []
+    return [name for name in forecast_names if not name.startswith('scec.csep')]
+
+
+class ForecastNameCatalog:
+    """
+    forecast names of a forecast directory, in the order os.walk finds them. the catalog maps every directory to
+    [modification time, subdirectories, forecast names].
+    """
+    def __init__(self, forecast_dir, path=None):
+        self.forecast_dir = forecast_dir
+        self.path = path
+        # directories listed by the last refresh
+        self.listed = 0
+        self._dirs = self._load()
+        self._lock = threading.Lock()
+
+    def names(self, rescan=False):
+        """
+        refreshes the catalog and returns the unique forecast names
+        :param rescan: list every directory again instead of trusting the catalog
+        :return: list of forecast names
+        """
+        with self._lock:
+            if rescan:
+                self._dirs = {}
+            self.listed = 0
+            dirs = {}
+            found = OrderedDict()
+            self._refresh(self.forecast_dir, dirs, found, time.time() - racy_seconds)
+            if dirs != self._dirs:
+                self._dirs = dirs
+                self._save()
+            return list(found)
+
+    def _refresh(self, path, dirs, found, racy):
+        # top-down, like os.walk
+        try:
+            mtime = fs.stat(path).st_mtime_ns
+        except OSError:
+            return
+        entry = self._dirs.get(path)
+        if entry is None or entry[0] != mtime:
+            entry = self._list(path, mtime, racy)
+            if entry is None:
+                return
+        dirs[path] = entry
+        for name in entry[2]:
+            found[name] = None
+        for subdir in entry[1]:
+            self._refresh(os.path.join(path, subdir), dirs, found, racy)
+
+    def _list(self, path, mtime, racy):
+        subdirs = []
+        files = []
+        try:
+            with fs.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry.name)
+                    # symbolic links to directories are not followed
+                    elif not entry.is_symlink():
+                        subdirs.append(entry.name)
+        except OSError:
+            return None
+        self.listed += 1
+        if mtime / 1e9 > racy:
+            mtime = None
+        return [mtime, subdirs, directory_names(files)]
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if stored.get('forecast_dir') != self.forecast_dir:
+            return {}
+        return stored.get('dirs', {})
+
+    def _save(self):
+        if self.path is None:
+            return
+        # the catalog only saves time, the archive can always be listed again
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'forecast_dir': self.forecast_dir, 'dirs': self._dirs}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+_catalogs = {}
+_lock = threading.Lock()
+
+
+def catalog_path(forecast_dir):
+    """
+    :param forecast_dir: path of the forecast directory
+    :return: path of the stored catalog, None if catalogs are not stored
+    """
+    if not cache_dir:
+        return None
+    digest = hashlib.sha1(os.path.abspath(forecast_dir).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'forecast_names', digest + '.json')
+
+
+def forecast_names(forecast_dir, rescan=False):
+    """
+    forecast names of a forecast directory using the process-wide catalogs, see ForecastNameCatalog.names
+    """
+    with _lock:
+        catalog = _catalogs.get(forecast_dir)
+        if catalog is None:
+            catalog = ForecastNameCatalog(forecast_dir, catalog_path(forecast_dir))
+            _catalogs[forecast_dir] = catalog
+    return catalog.names(rescan)
+
+
+def clear():
+    """
+    drops catalogs held in memory, stored catalogs are kept
+    :return: none
+    """
+    with _lock:
+        _catalogs.clear()
+
+
+def configure(directory):
+    """
+    changes where catalogs are stored
+    :param directory: cache directory, None keeps catalogs in memory only
+    :return: none
+    """
+    global cache_dir
+    cache_dir = directory
+    clear()
@@ -0,0 +1,89 @@
+import os
+from artifacts import profiling
+
+"""
+filesystem access of the extraction. everything is read from the live filesystem, unless a snapshot manifest was
+loaded with use(), in which case the same calls are answered from the manifest, see artifacts/snapshot.py. calls
+are counted by kind when profiling is enabled.
+"""
+
+_snapshot = None
+
+
+def use(snapshot):
+    """
+    answers filesystem calls from a snapshot
+    :param snapshot: Snapshot object, None for the live filesystem
+    :return: none
+    """
+    global _snapshot
+    _snapshot = snapshot
+
+
+def snapshot():
+    """
+    :return: Snapshot object in use, None for the live filesystem
+    """
+    return _snapshot
+
+
+def stat(path):
+    """
+    replacement for os.stat
+    :param path: path of a file or directory
+    :return: os.stat_result, or an object with st_mtime_ns, st_ctime and st_size
+    :raises: FileNotFoundError if path does not exist
+    """
+    profiling.count('stat')
+    if _snapshot is None:
+        return os.stat(path)
+    return _snapshot.stat(path)
+
+
+def scandir(path):
+    """
+    replacement for os.scandir, must be used as a context manager
+    :param path: directory path
+    :return: iterator of os.DirEntry like objects
+    :raises: FileNotFoundError if the directory does not exist
+    """
+    profiling.count('scandir')
+    if _snapshot is None:
+        return os.scandir(path)
+    return _snapshot.scandir(path)
+
+
+def read_text(path):
+    """
+    :param path: file path
+    :return: contents of the file
+    :raises: FileNotFoundError if the file does not exist
+    """
+    if _snapshot is None:
+        with open(path, 'r') as f:
+            text = f.read()
+    else:
+        text = _snapshot.read_text(path)
+    profiling.count('read', len(text))
+    return text
+
+
+def stored_meta(path):
+    """
+    :param path: path of a meta file
+    :return: dict() keys of the meta file stored in the snapshot, None if they have to be parsed from the file
+    """
+    if _snapshot is None:
+        return None
+    return _snapshot.meta(path)
+
+
+def local_path(path):
+    """
+    path to hand to parsers that open files themselves
+    :param path: file path
+    :return: path on the live filesystem holding the contents of the file
+    """
+    if _snapshot is None:
+        return path
+    return _snapshot.local_path(path)
@@ -1,9 +1,39 @@
 import sys
 import sqlite3
 import csv
+from itertools import islice
+
+"""
+bulk loader for csv files. rows are streamed in chunks into parameterized executemany statements, each table is
+loaded in a single transaction, and conflicting rows are handled by a policy instead of failing one by one.
+"""
 
 verbose = False
 
+# rows handed to executemany at once
+chunk_size = 10000
+
+# what happens to rows violating a unique or not null constraint
+# abort: the table is rolled back, ignore: the row is skipped, replace: the existing row is replaced,
+# update: the existing row is updated with the values of the new row
+policies = ('abort', 'ignore', 'replace', 'update')
+
+
+class LoadSummary:
+    """
+    rows read, inserted, updated and skipped while loading a table
+    """
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+
+    def __str__(self):
+        return '{}: {} rows, {} inserted, {} updated, {} skipped'.format(self.table, self.rows, self.inserted,
+                                                                         self.updated, self.skipped)
+
 
 def _get_fields(cursor, table_name):
     """
@@ -13,56 +43,130 @@ def _get_fields(cursor, table_name):
     :return: list containing names of all fields in table
              if the table is not found, returns empty list.
     """
-    try:
-        cursor.execute("select * from {}".format(table_name))
-    except sqlite3.OperationalError:
+    cursor.execute("PRAGMA table_info({})".format(table_name))
+    names = [row[1] for row in cursor.fetchall()]
+    if not names:
         print("error: table {} does not exist in database".format(table_name))
-        return []
-    names = [f[0] for f in cursor.description]
     return names
 
 
-def insert(cursor, table, fields, values):
-    num = len(values)
-    if num == 0:
-        print("Warning: Skipping inserts, no values found.")
-    try:
-        if verbose:
-            print("INSERT INTO {0} ({1}) VALUES ({2});".format(table, fields, values))
-        cursor.execute("INSERT INTO {0} ({1}) VALUES ({2});".format(table, fields, values))
-    except sqlite3.IntegrityError:
-        print("Warning: Integrity Error, Unique constraint failed for table {}".format(table))
-    return True
+def _unique_columns(cursor, table_name, fields):
+    # columns of the first unique constraint covered by the loaded fields, the target of an upsert
+    cursor.execute("PRAGMA index_list({})".format(table_name))
+    for index in cursor.fetchall():
+        if not index[2]:
+            continue
+        columns = [row[2] for row in cursor.execute("PRAGMA index_info({})".format(index[1])).fetchall()]
+        if columns and all(column in fields for column in columns):
+            return columns
+    return []
 
 
-def _insert_from_csv(filename, cursor, table, fields):
-    with open(filename) as f:
-        reader = csv.reader(f)
-        for row in reader:
-            quote_row = ['"' + item + '"' for item in row[1:]]
-            if not insert(cursor, table, fields, ', '.join(quote_row)):
-                return False
-    return True
+def insert_statement(cursor, table, fields, policy='ignore'):
+    """
+    parameterized insert statement of a conflict policy
+    :param cursor: cursor for sqlite3 database
+    :param table: name of the table
+    :param fields: list of field names in the order of the values
+    :param policy: one of policies
+    :return: sql statement
+    """
+    if policy not in policies:
+        raise ValueError("unknown conflict policy: {}".format(policy))
+    statement = "INSERT {}INTO {} ({}) VALUES ({})".format(
+        {'ignore': 'OR IGNORE ', 'replace': 'OR REPLACE '}.get(policy, ''), table, ', '.join(fields),
+        ', '.join('?' * len(fields)))
+    if policy == 'update':
+        target = _unique_columns(cursor, table, fields)
+        if target:
+            updates = [field for field in fields if field not in target]
+            statement += " ON CONFLICT ({}) DO {}".format(
+                ', '.join(target),
+                'UPDATE SET ' + ', '.join('{0}=excluded.{0}'.format(field) for field in updates) if updates
+                else 'NOTHING')
+    return statement
+
+
+def load_rows(conn, table, fields, rows, policy='ignore'):
+    """
+    loads rows into a table in a single transaction, in chunks of chunk_size
+    :param conn: sqlite3 connection
+    :param table: name of the table
+    :param fields: list of field names in the order of the values
+    :param rows: iterable of sequences of values, eg., a csv reader or a cursor
+    :param policy: one of policies
+    :return: LoadSummary
+    :raises: sqlite3.IntegrityError with policy 'abort', after rolling back the table
+    """
+    summary = LoadSummary(table)
+    cursor = conn.cursor()
+    statement = insert_statement(cursor, table, fields, policy)
+    if verbose:
+        print(statement)
+    count = "select count(*) from {}".format(table)
+    before = cursor.execute(count).fetchone()[0]
+    # rows changed by the statement itself, unlike total_changes the rowcount leaves out the rows written by triggers,
+    # eg., the summary triggers of db_schema.sql
+    changed = 0
+    rows = iter(rows)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            cursor.executemany(statement, chunk)
+            changed += cursor.rowcount
+            summary.rows += len(chunk)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    summary.inserted = cursor.execute(count).fetchone()[0] - before
+    summary.updated = changed - summary.inserted
+    summary.skipped = summary.rows - changed
+    return summary
+
+
+def load_csv(conn, table, filename, fields, policy='ignore'):
+    """
+    loads a csv file whose first column names the table, eg., testing_data/*.csv
+    :param conn: sqlite3 connection
+    :param table: name of the table
+    :param filename: path of the csv file
+    :param fields: list of field names of the remaining columns
+    :param policy: one of policies
+    :return: LoadSummary
+    """
+    with open(filename, newline='') as f:
+        rows = (row[1:] for row in csv.reader(f) if row)
+        return load_rows(conn, table, fields, rows, policy)
 
 
-def load_data(db_path, tables, join_tables=[]):
+def load_data(db_path, tables, join_tables=[], policy='ignore'):
+    """
+    loads csv files into their tables. the primary key of a table is assigned by the database, except for join tables
+    whose composite primary key is part of the data.
+    :param db_path: path of the sqlite3 database
+    :param tables: dict mapping table name -> csv file
+    :param join_tables: tables whose csv files include every field
+    :param policy: one of policies
+    :return: list of LoadSummary
+    """
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
+    summaries = []
     for k, v in tables.items():
-        print('loading data for {}'.format(k))
+        fields = _get_fields(c, k)
         # need to handle join tables differently, bc composite private key must be explicitly imported
         if k not in join_tables:
-            if verbose:
-                print("{} not in join tables".format(k))
-            f = ', '.join(_get_fields(c, k)[1:])
-            if _insert_from_csv(v, c, k, f):
-                conn.commit()
-        else:
-            if verbose:
-                print("{} in join tables.".format(k))
-            f = ', '.join(_get_fields(c, k))
-            if _insert_from_csv(v, c, k, f):
-                conn.commit()
+            fields = fields[1:]
+        if not fields:
+            continue
+        summary = load_csv(conn, k, v, fields, policy)
+        print(summary)
+        summaries.append(summary)
+    conn.close()
+    return summaries
 
 
 if __name__ == "__main__":
@@ -78,14 +182,5 @@ if __name__ == "__main__":
               'Catalogs': './testing_data/catalogs.csv',
               'Dispatchers_ForecastGroups': './testing_data/dispatchers_forecastgroups.csv'}
     join_tables = ['Dispatchers_ForecastGroups']
-    load_data(db_path, tables, join_tables)
-
-
-
-
-
-
-
-
-
-
+    policy = sys.argv[1] if len(sys.argv) > 1 else 'ignore'
+    load_data(db_path, tables, join_tables, policy)
@@ -0,0 +1,111 @@
+import re
+import threading
+from collections import OrderedDict
+from artifacts import fs
+
+"""
+process-wide cache of parsed meta files. forecasts, evaluations and catalogs each read several keys from the same
+.meta file, so every file is read once, scanned for all known keys in a single pass and memoized by path, mtime
+and size.
+"""
+
+# one pattern for every key. the lookahead makes matches zero-width, so a key inside the value of another key is
+# found just like with separate searches.
+meta_pattern = re.compile(r"(?=--(?P<arg>waitingPeriod|runtimeTestDate|logFile)=(?P<arg_value>\S*)'"
+                          r"|(?P<runtime>runtimeDirectory)=(?P<runtime_value>\S*)'"
+                          r"|(?P<creation>CreationDateTime) = (?P<creation_value>\S*))")
+
+
+def parse_text(text):
+    """
+    extracts known keys from the contents of a meta file. only the first occurrence of a key is kept.
+    :param text: contents of the meta file
+    :return: dict() keys
+            [type] file type stored as comment # in first line of the file
+            [waitingPeriod], [runtimeTestDate], [logFile], [runtimeDirectory], [CreationDateTime] if present
+    """
+    first_line = text.split('\n', 1)[0]
+    metadata = {'type': first_line[1:].strip()}
+    for match in meta_pattern.finditer(text):
+        for key, value in (('arg', 'arg_value'), ('runtime', 'runtime_value'), ('creation', 'creation_value')):
+            name = match.group(key)
+            if name:
+                metadata.setdefault(name, match.group(value))
+                break
+    return metadata
+
+
+class MetaFileCache:
+    """
+    maps meta file path -> parsed keys with least-recently-used eviction. an entry is re-read when the
+    modification time or size of the file changes.
+    """
+    def __init__(self, maxsize=8192):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, path):
+        """
+        returns parsed keys of a meta file, reading the file only if it is not cached or has changed on disk
+        :param path: path of the meta file
+        :return: dict() see parse_text, must not be modified
+        :raises: FileNotFoundError if the file does not exist
+        """
+        stat = fs.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+
+        self.misses += 1
+        # snapshots store the parsed keys
+        metadata = fs.stored_meta(path)
+        if metadata is None:
+            metadata = parse_text(fs.read_text(path))
+        with self._lock:
+            self._entries[path] = (key, metadata)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return metadata
+
+    def clear(self):
+        """
+        drops every cached meta file
+        :return: none
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = MetaFileCache()
+
+
+def parse(path):
+    """
+    parses a meta file using the process-wide cache, see MetaFileCache.parse
+    """
+    return _cache.parse(path)
+
+
+def clear():
+    """
+    drops cached meta files, see MetaFileCache.clear
+    """
+    _cache.clear()
+
+
+def configure(maxsize=None):
+    """
+    adjusts the size of the process-wide cache
+    :param maxsize: maximum number of meta files held
+    :return: none
+    """
+    if maxsize is not None:
+        _cache.maxsize = maxsize
@@ -0,0 +1,123 @@
+import os
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from artifacts import dircache, metafile, profiling
+
+"""
+asynchronous prefetching for high-latency filesystems. the directories a scan is about to read are listed, their
+meta files parsed and selected entries stat'd concurrently, by an asyncio event loop that hands the calls to a
+bounded thread pool and caps the number of calls in flight. the results land in the process-wide caches of
+artifacts.dircache and artifacts.metafile, so the records are still built by the same serial code, which then finds
+everything cached.
+
+failed calls are ignored, the serial pass repeats them and handles the error as usual.
+"""
+
+
+class Request:
+    """
+    directory to prefetch. every meta file in it is parsed, and the entries whose names match stat_pattern are
+    stat'd.
+    """
+    __slots__ = ('path', 'stat_pattern')
+
+    def __init__(self, path, stat_pattern=None):
+        self.path = path
+        self.stat_pattern = stat_pattern
+
+
+class Prefetcher:
+    """
+    runs an event loop in a background thread, calls are made by a pool of threads with at most in_flight calls
+    submitted at once
+    """
+    def __init__(self, threads=32, in_flight=256, lookahead=8):
+        """
+        :param threads: number of threads making filesystem calls
+        :param in_flight: maximum number of calls submitted to the threads at once
+        :param lookahead: number of items prefetched ahead of the one being processed, see prefetched()
+        """
+        self.threads = threads
+        self.in_flight = in_flight
+        self.lookahead = lookahead
+        self.calls = 0
+        # reads of the threads are counted for the prefetch phase, not the phase the scan is in
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix='prefetch', initializer=profiling.tag_thread,
+                                            initargs=('prefetch',))
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='prefetch-loop', daemon=True)
+        self._thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(self._create_semaphore(), self._loop).result()
+
+    def submit(self, requests):
+        """
+        starts prefetching directories
+        :param requests: list of Request
+        :return: concurrent.futures.Future, done when every call finished
+        """
+        return asyncio.run_coroutine_threadsafe(self._prefetch(requests), self._loop)
+
+    def prefetched(self, items, requests):
+        """
+        generator of items, each yielded once the directories it reads are prefetched. the directories of the next
+        lookahead items are prefetched while an item is processed. directories requested for an earlier item are
+        not prefetched again.
+        :param items: iterable of items, eg., scheduled dates
+        :param requests: function item -> list of Request
+        :return: generator of items in the same order
+        """
+        pending = deque()
+        seen = set()
+        for item in items:
+            new = [request for request in requests(item) if request.path not in seen]
+            seen.update(request.path for request in new)
+            pending.append((item, self.submit(new)))
+            if len(pending) > self.lookahead:
+                yield self._wait(*pending.popleft())
+        while pending:
+            yield self._wait(*pending.popleft())
+
+    def close(self):
+        """
+        stops the event loop and the threads
+        :return: none
+        """
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _wait(item, future):
+        with profiling.phase('prefetch'):
+            future.result()
+        return item
+
+    async def _create_semaphore(self):
+        # bound to the loop of the background thread
+        return asyncio.Semaphore(self.in_flight)
+
+    async def _prefetch(self, requests):
+        await asyncio.gather(*(self._directory(request) for request in requests))
+
+    async def _directory(self, request):
+        try:
+            listing = await self._call(dircache.listing, request.path)
+        except OSError:
+            return
+        calls = []
+        for name, entry in listing.entries.items():
+            if not entry.is_file:
+                continue
+            if name.endswith('.meta'):
+                calls.append(self._call(metafile.parse, os.path.join(request.path, name)))
+            elif request.stat_pattern is not None and request.stat_pattern.match(name):
+                calls.append(self._call(entry.stat))
+        await asyncio.gather(*calls, return_exceptions=True)
+
+    async def _call(self, function, *args):
+        async with self._semaphore:
+            self.calls += 1
+            return await self._loop.run_in_executor(self._executor, function, *args)
@@ -0,0 +1,234 @@
+import time
+import threading
+from collections import OrderedDict
+
+"""
+timing instrumentation of the extraction. once enabled, every phase records calls, wall time and bytes read, and
+every filesystem call made through artifacts.fs is counted by kind, both per forecast group. phases nest, the time
+of an inner phase is not counted for the outer one, so the times of a group add up. bytes read by threads tagged with
+tag_thread(), eg., the threads of artifacts.prefetch, are counted for their own phase instead of the phase the main
+thread is in. disabled by default, then phase() and count() do nothing.
+"""
+
+# phases of the extraction, in the order they are reported
+phases = ['dispatchers', 'groups', 'day states', 'prefetch', 'forecasts', 'evaluations', 'catalogs', 'inserts', 'indexes',
+          'summaries']
+
+
+class Profiler:
+    """
+    accumulates (group, phase) -> [calls, seconds, bytes] and (group, kind) -> filesystem calls
+    """
+    def __init__(self):
+        self.group = ''
+        self.phases = {}
+        self.syscalls = {}
+        # [phase, start of the time not yet accounted]
+        self._stack = []
+        # filesystem calls are also counted by the threads of artifacts.prefetch, reentrant for _stats
+        self._lock = threading.RLock()
+
+    def enter(self, name):
+        with self._lock:
+            now = time.perf_counter()
+            if self._stack:
+                parent = self._stack[-1]
+                self._stats(parent[0])[1] += now - parent[1]
+            self._stack.append([name, now])
+            self._stats(name)[0] += 1
+
+    def exit(self):
+        with self._lock:
+            now = time.perf_counter()
+            name, start = self._stack.pop()
+            self._stats(name)[1] += now - start
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def count(self, kind, nbytes=0, phase=None):
+        """
+        :param kind: kind of call
+        :param nbytes: bytes read by the call
+        :param phase: phase the bytes are counted for, by default the innermost phase entered
+        :return: none
+        """
+        key = (self.group, kind)
+        with self._lock:
+            self.syscalls[key] = self.syscalls.get(key, 0) + 1
+            if phase is None and self._stack:
+                phase = self._stack[-1][0]
+            if nbytes and phase is not None:
+                self._stats(phase)[2] += nbytes
+
+    def drain(self):
+        """
+        :return: tuple (phases, syscalls) recorded since the last drain, see merge
+        """
+        with self._lock:
+            stats = (self.phases, self.syscalls)
+            self.phases = {}
+            self.syscalls = {}
+        return stats
+
+    def merge(self, stats):
+        """
+        adds the stats drained from another profiler, eg., of a worker process
+        :param stats: tuple (phases, syscalls)
+        :return: none
+        """
+        phase_stats, syscalls = stats
+        with self._lock:
+            for key, values in phase_stats.items():
+                totals = self.phases.setdefault(key, [0, 0.0, 0])
+                for i, value in enumerate(values):
+                    totals[i] += value
+            for key, count in syscalls.items():
+                self.syscalls[key] = self.syscalls.get(key, 0) + count
+
+    def _stats(self, name):
+        key = (self.group, name)
+        with self._lock:
+            stats = self.phases.get(key)
+            if stats is None:
+                stats = self.phases[key] = [0, 0.0, 0]
+        return stats
+
+
+class _Phase:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if _profiler is not None:
+            _profiler.enter(self.name)
+
+    def __exit__(self, *exc):
+        if _profiler is not None:
+            _profiler.exit()
+        return False
+
+
+class _Disabled:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        return False
+
+
+_profiler = None
+_disabled = _Disabled()
+# phase of the reads of tagged threads, see tag_thread
+_threads = threading.local()
+
+
+def enable():
+    """
+    starts recording with an empty profiler
+    :return: none
+    """
+    global _profiler
+    _profiler = Profiler()
+
+
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def enabled():
+    return _profiler is not None
+
+
+def phase(name):
+    """
+    context manager timing a phase of the extraction
+    :param name: name of the phase, see phases
+    :return: context manager
+    """
+    if _profiler is None:
+        return _disabled
+    return _Phase(name)
+
+
+def group(name):
+    """
+    attributes the following phases and filesystem calls to a forecast group
+    :param name: name of the forecast group, '' for work shared by all groups
+    :return: none
+    """
+    if _profiler is not None:
+        _profiler.group = name
+
+
+def count(kind, nbytes=0):
+    """
+    counts a filesystem call
+    :param kind: kind of call, eg., stat, scandir or read
+    :param nbytes: bytes read by the call
+    :return: none
+    """
+    if _profiler is not None:
+        _profiler.count(kind, nbytes, getattr(_threads, 'phase', None))
+
+
+def tag_thread(name):
+    """
+    counts the bytes read by the calling thread for a phase, whatever phase the main thread is in. used as the
+    initializer of threads reading on behalf of a phase
+    :param name: name of the phase, see phases
+    :return: none
+    """
+    _threads.phase = name
+
+
+def drain():
+    """
+    stats recorded since the last drain, None if disabled, see Profiler.drain
+    """
+    if _profiler is None:
+        return None
+    return _profiler.drain()
+
+
+def merge(stats):
+    """
+    adds drained stats to the process-wide profiler, see Profiler.merge
+    """
+    if _profiler is not None and stats is not None:
+        _profiler.merge(stats)
+
+
+def report():
+    """
+    per group summary of the recorded phases and filesystem calls
+    :return: report as text, empty string if disabled
+    """
+    if _profiler is None:
+        return ''
+    groups = OrderedDict()
+    for group_name, name in sorted(_profiler.phases):
+        groups.setdefault(group_name, None)
+    for group_name, kind in sorted(_profiler.syscalls):
+        groups.setdefault(group_name, None)
+    kinds = sorted(set(kind for group_name, kind in _profiler.syscalls))
+
+    lines = ['{:<40} {:<12} {:>10} {:>10} {:>12}'.format('group', 'phase', 'calls', 'seconds', 'bytes')]
+    for group_name in groups:
+        names = [name for name in phases if (group_name, name) in _profiler.phases]
+        names += sorted(name for g, name in _profiler.phases if g == group_name and name not in phases)
+        total = 0.0
+        for name in names:
+            calls, seconds, nbytes = _profiler.phases[(group_name, name)]
+            total += seconds
+            lines.append('{:<40} {:<12} {:>10} {:>10.3f} {:>12}'.format(group_name or '(all)', name, calls, seconds,
+                                                                      nbytes))
+        lines.append('{:<40} {:<12} {:>10} {:>10.3f} {:>12}'.format(group_name or '(all)', 'total', '', total, ''))
+    lines.append('')
+    lines.append('{:<40} '.format('group') + ' '.join('{:>10}'.format(kind) for kind in kinds))
+    for group_name in groups:
+        lines.append('{:<40} '.format(group_name or '(all)') +
+                     ' '.join('{:>10}'.format(_profiler.syscalls.get((group_name, kind), 0)) for kind in kinds))
+    return '\n'.join(lines)
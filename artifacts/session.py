@@ -0,0 +1,94 @@
+import sqlite3
+from collections import OrderedDict
+
+"""
+database sessions for the extraction. connections are opened with a pragma profile, and the session decides when
+buffered rows are committed. every profile except 'legacy' uses write-ahead logging, so queries can read the
+database while an extraction is writing to it.
+"""
+
+profiles = {
+    # sqlite defaults, rollback journal with synchronous=FULL
+    'legacy': OrderedDict(),
+    # durable, readers never block the writer
+    'safe': OrderedDict([('journal_mode', 'WAL'),
+                         ('synchronous', 'NORMAL'),
+                         ('cache_size', -64000),
+                         ('mmap_size', 268435456),
+                         ('temp_store', 'MEMORY')]),
+    # fastest, the database could be lost on power failure but can always be extracted again
+    'bulk': OrderedDict([('journal_mode', 'WAL'),
+                         ('synchronous', 'OFF'),
+                         ('cache_size', -256000),
+                         ('mmap_size', 1073741824),
+                         ('temp_store', 'MEMORY')]),
+}
+
+
+def apply_profile(conn, profile):
+    """
+    sets the pragmas of a profile on an open connection
+    :param conn: sqlite3 connection
+    :param profile: name of profile in profiles
+    :return: none
+    :raises: ValueError if the profile does not exist
+    """
+    try:
+        pragmas = profiles[profile]
+    except KeyError:
+        raise ValueError("unknown database profile: {}".format(profile))
+    for pragma, value in pragmas.items():
+        conn.execute("PRAGMA {}={}".format(pragma, value))
+
+
+def connect(db_filename, profile='safe', timeout=30.0):
+    """
+    opens sqlite3 database with a pragma profile
+    :param db_filename: path to the sqlite3 database
+    :param profile: name of profile in profiles
+    :param timeout: seconds to wait for a lock held by another connection
+    :return: sqlite3 connection
+    """
+    conn = sqlite3.connect(db_filename, timeout=timeout)
+    apply_profile(conn, profile)
+    return conn
+
+
+class Session:
+    """
+    commits the rows buffered by a BulkInserter in batches. without a commit size, a commit is made at the end of
+    every forecast group. with a commit size, a commit is made once at least that many rows were buffered since the
+    last commit, which keeps write transactions short regardless of the size of the groups.
+    """
+    def __init__(self, conn, inserter, commit_size=None):
+        self.conn = conn
+        self.inserter = inserter
+        self.commit_size = commit_size
+        self.commits = 0
+        self._committed = inserter.count
+
+    def written(self):
+        """
+        called after a unit of work was buffered, commits if the commit size was reached
+        :return: none
+        """
+        if self.commit_size and self.inserter.count - self._committed >= self.commit_size:
+            self.commit()
+
+    def group_done(self):
+        """
+        called at the end of a forecast group, commits unless batching by commit size
+        :return: none
+        """
+        if not self.commit_size:
+            self.commit()
+
+    def commit(self):
+        """
+        writes buffered rows and commits
+        :return: none
+        """
+        self.inserter.flush()
+        self.conn.commit()
+        self._committed = self.inserter.count
+        self.commits += 1
@@ -0,0 +1,298 @@
+import atexit
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from collections import namedtuple
+from artifacts import fs, dircache, metafile, forecastnames
+from artifacts.metafile import parse_text
+import configs
+
+"""
+snapshot manifests of a testing center. a snapshot is a sqlite3 file holding every entry of the forecast, result and
+observation directories of the forecast groups, with sizes, creation and modification times, the parsed keys of
+every meta file and the contents of the dispatcher scripts and init files. once loaded with load(), the extraction
+reads the manifest instead of the live filesystem and produces the same database.
+"""
+
+manifest_schema = """
+CREATE TABLE IF NOT EXISTS Entries (
+    dirname TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER,
+    is_file INTEGER NOT NULL,
+    is_dir INTEGER NOT NULL,
+    is_symlink INTEGER NOT NULL,
+    listed INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER,
+    ctime REAL,
+    size INTEGER,
+    PRIMARY KEY (dirname, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS MetaKeys (
+    path TEXT PRIMARY KEY,
+    keys TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS Contents (
+    path TEXT PRIMARY KEY,
+    contents TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+SnapshotStat = namedtuple('SnapshotStat', ['st_mtime_ns', 'st_ctime', 'st_size'])
+
+
+class SnapshotEntry:
+    """
+    os.DirEntry read from a snapshot
+    """
+    __slots__ = ('name', 'path', '_is_file', '_is_dir', '_is_symlink', '_stat')
+
+    def __init__(self, dirname, name, is_file, is_dir, is_symlink, stat):
+        self.name = name
+        self.path = os.path.join(dirname, name)
+        self._is_file = bool(is_file)
+        self._is_dir = bool(is_dir)
+        self._is_symlink = bool(is_symlink)
+        self._stat = stat
+
+    def is_file(self):
+        return self._is_file
+
+    def is_dir(self):
+        return self._is_dir
+
+    def is_symlink(self):
+        return self._is_symlink
+
+    def stat(self):
+        if self._stat is None:
+            raise FileNotFoundError(self.path)
+        return self._stat
+
+
+class _Entries(list):
+    # supports 'with fs.scandir(path) as entries' like os.scandir
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Snapshot:
+    """
+    read-only view of a snapshot manifest with the calls used through artifacts.fs
+    """
+    def __init__(self, filename):
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(filename)
+        self.filename = filename
+        self._local = threading.local()
+        self._local_dir = None
+
+    @property
+    def conn(self):
+        # sqlite3 connections cannot be shared with forked worker processes, nor with the threads of artifacts.prefetch
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.conn = sqlite3.connect('file:{}?mode=ro'.format(self.filename), uri=True)
+            local.pid = os.getpid()
+        return local.conn
+
+    def stat(self, path):
+        dirname, name = os.path.split(os.path.normpath(path))
+        row = self.conn.execute('select mtime_ns, ctime, size from Entries where dirname=? and name=?',
+                                (dirname, name)).fetchone()
+        if row is None or row[0] is None:
+            raise FileNotFoundError(path)
+        return SnapshotStat(*row)
+
+    def scandir(self, path):
+        dirname, name = os.path.split(os.path.normpath(path))
+        row = self.conn.execute('select listed from Entries where dirname=? and name=?', (dirname, name)).fetchone()
+        if row is None or not row[0]:
+            raise FileNotFoundError(path)
+        cursor = self.conn.execute('select name, is_file, is_dir, is_symlink, mtime_ns, ctime, size from Entries '
+                                   'where dirname=? and position is not null order by position',
+                                   (os.path.normpath(path),))
+        return _Entries(SnapshotEntry(path, name, is_file, is_dir, is_symlink,
+                                      SnapshotStat(mtime_ns, ctime, size) if mtime_ns is not None else None)
+                        for name, is_file, is_dir, is_symlink, mtime_ns, ctime, size in cursor)
+
+    def read_text(self, path):
+        row = self.conn.execute('select contents from Contents where path=?', (os.path.normpath(path),)).fetchone()
+        if row is None:
+            raise FileNotFoundError(path)
+        return row[0]
+
+    def meta(self, path):
+        row = self.conn.execute('select keys from MetaKeys where path=?', (os.path.normpath(path),)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def local_path(self, path):
+        """
+        writes the stored contents of a file below a temporary directory, for parsers that open files themselves
+        :param path: file path
+        :return: path of the copy
+        """
+        if self._local_dir is None:
+            self._local_dir = tempfile.mkdtemp(prefix='csep_snapshot_')
+            atexit.register(shutil.rmtree, self._local_dir, True)
+        local_path = os.path.join(self._local_dir, os.path.abspath(path).lstrip(os.sep))
+        if not os.path.isfile(local_path):
+            contents = self.read_text(path)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            with open(local_path, 'w') as f:
+                f.write(contents)
+        return local_path
+
+
+class Crawler:
+    """
+    writes the entries of the testing center into a manifest. every directory is listed once and every entry is
+    stat'd once.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.entries = 0
+        self._listed = set()
+
+    def add_file(self, path, contents=False):
+        """
+        records a single file
+        :param path: file path
+        :param contents: also store the contents of the file
+        :return: none
+        """
+        path = os.path.normpath(path)
+        self._add_root(path)
+        if contents:
+            with open(path, 'r') as f:
+                self.conn.execute('insert or replace into Contents (path, contents) values (?, ?)', (path, f.read()))
+
+    def add_tree(self, path):
+        """
+        records a directory and everything below it. symbolic links to directories are followed, unless they lead
+        back up the tree.
+        :param path: directory path
+        :return: none
+        """
+        path = os.path.normpath(path)
+        if not self._add_root(path):
+            return
+        # directory, real paths of the directories above it
+        pending = [(path, ())]
+        while pending:
+            directory, chain = pending.pop()
+            real_path = os.path.realpath(directory)
+            # links back up the tree would never end
+            if directory in self._listed or real_path in chain:
+                continue
+            self._listed.add(directory)
+            chain += (real_path,)
+            pending.extend((subdir, chain) for subdir in reversed(self._list(directory)))
+
+    def _add_root(self, path):
+        dirname, name = os.path.split(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        is_dir = os.path.isdir(path)
+        self.conn.execute('insert or ignore into Entries (dirname, name, is_file, is_dir, is_symlink, mtime_ns, ctime, '
+                          'size) values (?, ?, ?, ?, ?, ?, ?, ?)',
+                          (dirname, name, int(os.path.isfile(path)), int(is_dir), int(os.path.islink(path)),
+                           stat.st_mtime_ns, stat.st_ctime, stat.st_size))
+        self.entries += 1
+        return is_dir
+
+    def _list(self, directory):
+        subdirs = []
+        rows = []
+        try:
+            with os.scandir(directory) as it:
+                for position, entry in enumerate(it):
+                    try:
+                        is_file = entry.is_file()
+                        is_dir = entry.is_dir()
+                        stat = entry.stat()
+                        times = (stat.st_mtime_ns, stat.st_ctime, stat.st_size)
+                    except OSError:
+                        is_file = is_dir = False
+                        times = (None, None, None)
+                    rows.append((directory, entry.name, position, int(is_file), int(is_dir),
+                                 int(entry.is_symlink())) + times)
+                    if is_dir:
+                        subdirs.append(entry.path)
+                    elif is_file and entry.name.endswith('.meta'):
+                        self._add_meta(entry.path)
+        except OSError:
+            return []
+        self.conn.executemany('insert or replace into Entries (dirname, name, position, is_file, is_dir, is_symlink, '
+                              'listed, mtime_ns, ctime, size) values (?, ?, ?, ?, ?, ?, '
+                              'ifnull((select listed from Entries where dirname=? and name=?), 0), ?, ?, ?)',
+                              [row[:6] + row[:2] + row[6:] for row in rows])
+        parent, name = os.path.split(directory)
+        self.conn.execute('update Entries set listed=1 where dirname=? and name=?', (parent, name))
+        self.entries += len(rows)
+        return subdirs
+
+    def _add_meta(self, path):
+        try:
+            with open(path, 'r') as f:
+                metadata = parse_text(f.read())
+        except OSError:
+            return
+        self.conn.execute('insert or replace into MetaKeys (path, keys) values (?, ?)', (path, json.dumps(metadata)))
+
+
+def create(filename, scripts):
+    """
+    crawls the dispatchers, their forecast groups and the forecast, result and observation directories of the groups
+    into a new manifest
+    :param filename: path of the manifest, replaced if it exists
+    :param scripts: list of paths to dispatcher scripts
+    :return: number of entries recorded
+    """
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+    conn = sqlite3.connect(filename)
+    conn.executescript(manifest_schema)
+    crawler = Crawler(conn)
+    for script in scripts:
+        crawler.add_file(script, contents=True)
+        dispatcher = configs.load_dispatcher(script)
+        if dispatcher.config_file_name:
+            crawler.add_file(dispatcher.config_file_name, contents=True)
+        for group_path in dispatcher.group_paths:
+            group = configs.load_group(group_path)
+            crawler.add_file(group.config_filepath, contents=True)
+            for directory in (group.forecast_dir, group.result_dir, group.observation_dir):
+                if directory:
+                    crawler.add_tree(directory)
+    conn.commit()
+    conn.close()
+    return crawler.entries
+
+
+def load(filename):
+    """
+    answers every filesystem call of the extraction from a manifest, see artifacts.fs
+    :param filename: path of the manifest, None to go back to the live filesystem
+    :return: Snapshot object, None for the live filesystem
+    """
+    snapshot = Snapshot(filename) if filename else None
+    fs.use(snapshot)
+    # cached listings, meta files and configs were read from the previous source
+    dircache.invalidate()
+    metafile.clear()
+    forecastnames.clear()
+    configs.clear()
+    return snapshot
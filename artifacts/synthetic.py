@@ -0,0 +1,194 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+"""
+synthetic testing center for benchmarks. generates dispatcher scripts, dispatcher and forecast group init files and
+the forecast archive, result and observation directories of every group, laid out like /usr/local/csep and
+/home/csep/operations. the contents are decided by a seeded random generator, so the same parameters always give the
+same tree.
+"""
+
+# forecast group init file, models and tests run every day
+group_init_file = """<?xml version="1.0" encoding="UTF-8"?>
+<CSEPInitFile name="{description}">
+    <entryDate>{entry_date}</entryDate>
+    <forecastDir>forecasts</forecastDir>
+    <resultDir>results</resultDir>
+    <catalogDir>observations</catalogDir>
+    <postProcessing>OneDay</postProcessing>
+    <models>{models}<year value="*"><month value="*"><day value="*"/></month></year></models>
+    <evaluationTests>{tests}<year value="*"><month value="*"><day value="*"/></month></year></evaluationTests>
+</CSEPInitFile>
+"""
+
+dispatcher_init_file = """<?xml version="1.0" encoding="UTF-8"?>
+<CSEPInitFile>
+{groups}
+</CSEPInitFile>
+"""
+
+dispatcher_script = """#!/bin/tcsh
+python3 $CENTERCODE/src/generic/Dispatcher.py --configFile={config_file} --waitingPeriod={waiting_period} \\
+    --logFile={log_file} --year=`date +%Y` --month=`date +%m` --day=`date +%d`
+"""
+
+forecast_meta = ("# {name}\n"
+                 "CreationDateTime = {created}\n"
+                 "args '--waitingPeriod={waiting_period}' '--runtimeTestDate={date}' '--logFile={log_file}'\n")
+
+result_meta = ("# {name}\n"
+               "CreationDateTime = {created}\n"
+               "runtimeDirectory={runtime_dir}'\n")
+
+catalog_meta = ("# catalog.nodecl.dat\n"
+                "CreationDateTime = {created}\n")
+
+model_names = ['ETAS', 'STEP', 'KJSSOneDayCalifornia', 'ETAS_DROneDayMd3', 'ETAS_HWMd3', 'K3Md3', 'BayesianSTEP',
+               'HKJ', 'EEPAS', 'PPE', 'TripleS', 'ETAS_DROneDayPPEMd3']
+test_names = ['N', 'L', 'CL', 'M', 'S', 'R', 'T', 'W']
+
+
+class Parameters:
+    """
+    size of a synthetic testing center
+    """
+    def __init__(self, years=1, groups=2, models=4, tests=3, files_per_day=0, dispatchers=1, missing=0.1,
+                 start_date=datetime(2015, 1, 1), waiting_period=31, seed=0, days=None):
+        """
+        :param years: years of forecasts and evaluations in every group
+        :param groups: number of forecast groups
+        :param models: models per forecast group, each produces one forecast per day
+        :param tests: evaluation tests per forecast group
+        :param files_per_day: unrelated files added to every result and observation directory
+        :param dispatchers: number of dispatchers, groups are assigned round robin
+        :param missing: fraction of forecasts, results and catalogs left out
+        :param start_date: entry date of the first group, later groups start one month later each
+        :param waiting_period: waiting period of the dispatchers in days
+        :param seed: seed of the random generator
+        :param days: optional, length of the schedule in days instead of years
+        """
+        self.years = years
+        self.groups = groups
+        self.models = models
+        self.tests = tests
+        self.files_per_day = files_per_day
+        self.dispatchers = dispatchers
+        self.missing = missing
+        self.start_date = start_date
+        self.waiting_period = waiting_period
+        self.seed = seed
+        self.days = days
+
+    @property
+    def end_date(self):
+        """
+        :return: first day after the generated schedule
+        """
+        if self.days is not None:
+            return self.start_date + timedelta(days=self.days)
+        return self.start_date.replace(year=self.start_date.year + self.years)
+
+    def values(self):
+        return dict((key, str(value) if isinstance(value, datetime) else value) for key, value in vars(self).items())
+
+
+class Generator:
+    """
+    writes a synthetic testing center below a root directory
+    """
+    def __init__(self, root, parameters=None):
+        self.root = root
+        self.parameters = parameters or Parameters()
+        self.files = 0
+        self._random = random.Random(self.parameters.seed)
+
+    def generate(self):
+        """
+        writes the tree, existing files are overwritten
+        :return: list of paths to the dispatcher scripts
+        """
+        p = self.parameters
+        groups = [self._group(index) for index in range(p.groups)]
+        scripts = []
+        for index in range(p.dispatchers):
+            config_file = os.path.join(self.root, 'cronjobs', 'dispatcher_{}.init.xml'.format(index))
+            group_paths = groups[index::p.dispatchers]
+            self._write(config_file, dispatcher_init_file.format(
+                groups='\n'.join('    <forecastGroup>{}</forecastGroup>'.format(path) for path in group_paths)))
+            script = os.path.join(self.root, 'cronjobs', 'dispatcher_{}.tcsh'.format(index))
+            self._write(script, dispatcher_script.format(
+                config_file=config_file, waiting_period=p.waiting_period,
+                log_file=os.path.join(self.root, 'logs', 'dispatcher_{}.log'.format(index))))
+            scripts.append(script)
+        return scripts
+
+    def _group(self, index):
+        p = self.parameters
+        group_path = os.path.join(self.root, 'operations', 'one-day-models-V{}'.format(index + 1))
+        # later groups are introduced while earlier groups keep running
+        entry_date = p.start_date + timedelta(days=30 * index)
+        models = [model_names[i % len(model_names)] + ('' if i < len(model_names) else str(i))
+                  for i in range(p.models)]
+        tests = test_names[:p.tests]
+        self._write(os.path.join(group_path, 'forecast.init.xml'), group_init_file.format(
+            description='one-day-models-V{}'.format(index + 1), entry_date=entry_date.strftime('%Y-%m-%d %H:%M:%S'),
+            models=' '.join(models), tests=' '.join(tests)))
+
+        date = entry_date
+        while date < p.end_date:
+            self._day(group_path, date, models, tests)
+            date += timedelta(days=1)
+        return group_path
+
+    def _day(self, group_path, date, models, tests):
+        p = self.parameters
+        suffix = date.strftime('%-m_%-d_%Y')
+        day = date.strftime('%Y-%m-%d')
+        archive_dir = os.path.join(group_path, 'forecasts', 'archive', date.strftime('%Y_%-m'))
+        result_dir = os.path.join(group_path, 'results', day)
+        observation_dir = os.path.join(group_path, 'observations', day)
+
+        for model in models:
+            if self._random.random() < p.missing:
+                continue
+            name = '{}_{}-fromXML.xml'.format(model, suffix)
+            self._write(os.path.join(archive_dir, name), '<forecast/>\n')
+            self._write(os.path.join(archive_dir, name + '.meta'), forecast_meta.format(
+                name=name, created=date.strftime('%Y-%m-%dT00:30:00'), waiting_period=p.waiting_period, date=day,
+                log_file=os.path.join(self.root, 'logs', model, day + '.log')))
+
+            for test in tests:
+                if self._random.random() < p.missing:
+                    continue
+                name = 'rTest_{}-Test_{}_{}-fromXML.xml'.format(test, model, suffix)
+                self._write(os.path.join(result_dir, name), '<result/>\n')
+                self._write(os.path.join(result_dir, name + '.meta'), result_meta.format(
+                    name=name, created=(date + timedelta(days=1)).strftime('%Y-%m-%dT02:00:00'),
+                    runtime_dir=os.path.join(self.root, 'runtime', day)))
+
+        if self._random.random() >= p.missing:
+            name = 'catalog.nodecl.dat'
+            self._write(os.path.join(observation_dir, name), 'catalog\n')
+            self._write(os.path.join(observation_dir, name + '.meta'), catalog_meta.format(
+                created=(date + timedelta(days=1)).strftime('%Y-%m-%dT02:00:00')))
+
+        for i in range(p.files_per_day):
+            self._write(os.path.join(result_dir, 'plot_{}_{}.svg'.format(i, suffix)), '<svg/>\n')
+            self._write(os.path.join(observation_dir, 'catalog.{}.dat'.format(i)), 'catalog\n')
+
+    def _write(self, path, contents):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(contents)
+        self.files += 1
+
+
+def generate(root, parameters=None):
+    """
+    writes a synthetic testing center, see Generator
+    :param root: directory to write the tree to
+    :param parameters: Parameters object, defaults if not given
+    :return: list of paths to the dispatcher scripts
+    """
+    return Generator(root, parameters).generate()
@@ -0,0 +1,118 @@
+import os
+import json
+import shutil
+import tempfile
+import time
+import argparse
+from unittest import mock
+from statistics import median
+from artifacts import synthetic, profiling, dircache, metafile, forecastnames
+from artifacts.create import create_schema
+from models import BulkInserter, ForecastGroups
+from extraction import extract
+import configs
+
+"""
+benchmarks the extraction against a synthetic testing center. the tree is generated once, then extracted repeat
+times into a new database, with every process-wide cache cleared before each run, so the numbers only change with
+the code.
+"""
+
+sql_statements = 'db_schema.sql'
+index_statements = 'db_indexes.sql'
+
+
+def clear_caches():
+    """
+    forgets directory listings, meta files, configs and forecast name catalogs held by this process
+    :return: none
+    """
+    dircache.invalidate()
+    metafile.clear()
+    configs.clear()
+    # catalogs stored by earlier runs would skip the archive scan
+    forecastnames.configure(None)
+
+
+def run(scripts, db_filename, workers=1, profile='bulk', prefetch=None, now=None):
+    """
+    extracts the synthetic testing center once
+    :param scripts: list of paths to dispatcher scripts
+    :param db_filename: path of the database, replaced if it exists
+    :param workers: number of worker processes
+    :param profile: sqlite3 pragma profile
+    :param prefetch: optional, tuple (threads, in_flight), see extraction.extract
+    :param now: optional, datetime the statuses are decided against, see extraction.extract
+    :return: dict with seconds and row counts of the run
+    """
+    try:
+        os.remove(db_filename)
+    except FileNotFoundError:
+        pass
+    clear_caches()
+    profiling.enable()
+    db = create_schema(sql_statements, db_filename, profile=profile)
+    start = time.perf_counter()
+    extract(db, BulkInserter(db), scripts, workers=workers, index_statements=index_statements,
+            trigger_statements=sql_statements, prefetch=prefetch, now=now)
+    seconds = time.perf_counter() - start
+    rows = dict((table, db.execute('select count(*) from {}'.format(table)).fetchone()[0])
+                for table in ('Schedules', 'Forecasts', 'Evaluations'))
+    db.close()
+    return {'seconds': seconds, 'rows': rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='benchmark the extraction against a synthetic testing center')
+    parser.add_argument('--years', type=int, default=1, help='years of data in every forecast group (default: 1)')
+    parser.add_argument('--days', type=int, default=None, help='days of data instead of --years')
+    parser.add_argument('--groups', type=int, default=2, help='number of forecast groups (default: 2)')
+    parser.add_argument('--models', type=int, default=4, help='models per forecast group (default: 4)')
+    parser.add_argument('--tests', type=int, default=3, help='evaluation tests per forecast group (default: 3)')
+    parser.add_argument('--files-per-day', type=int, default=0,
+                        help='unrelated files in every result and observation directory (default: 0)')
+    parser.add_argument('--dispatchers', type=int, default=1, help='number of dispatchers (default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated contents (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed extractions (default: 3)')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes (default: 1)')
+    parser.add_argument('--async-io', type=int, metavar='THREADS',
+                        help='prefetch directories concurrently with THREADS threads, see extract.py')
+    parser.add_argument('--in-flight', type=int, default=256,
+                        help='maximum number of filesystem calls in flight with --async-io (default: 256)')
+    parser.add_argument('--root', help='directory to generate the synthetic testing center in and keep, a temporary '
+                                       'directory removed after the run by default')
+    parser.add_argument('--json', metavar='FILE', help='write parameters and results to FILE')
+    args = parser.parse_args()
+
+    parameters = synthetic.Parameters(years=args.years, groups=args.groups, models=args.models, tests=args.tests,
+                                      files_per_day=args.files_per_day, dispatchers=args.dispatchers, seed=args.seed,
+                                      days=args.days)
+    root = args.root or tempfile.mkdtemp(prefix='csep_benchmark_')
+    try:
+        start = time.perf_counter()
+        generator = synthetic.Generator(root, parameters)
+        scripts = generator.generate()
+        print('generated {} files in {:.1f}s below {}'.format(generator.files, time.perf_counter() - start, root))
+
+        # statuses do not depend on the day the benchmark runs, both the schedules and the classification end with
+        # the generated data
+        results = []
+        with mock.patch.object(ForecastGroups, 'end_date', parameters.end_date):
+            for i in range(args.repeat):
+                result = run(scripts, os.path.join(root, 'benchmark.sql3'), workers=args.workers,
+                             prefetch=(args.async_io, args.in_flight) if args.async_io else None,
+                             now=parameters.end_date)
+                results.append(result)
+                print('run {}: {:.3f}s {}'.format(i + 1, result['seconds'], result['rows']))
+        seconds = [result['seconds'] for result in results]
+        print('median {:.3f}s, min {:.3f}s, max {:.3f}s'.format(median(seconds), min(seconds), max(seconds)))
+        print(profiling.report())
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'parameters': parameters.values(), 'workers': args.workers,
+                           'async_io': args.async_io, 'seconds': seconds,
+                           'median': median(seconds), 'rows': results[-1]['rows']}, f, indent=2)
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
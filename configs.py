@@ -0,0 +1,200 @@
+import os
+import re
+import threading
+from collections import namedtuple
+from ForecastGroupInitFile import ForecastGroupInitFile
+from DispatcherInitFile import DispatcherInitFile
+from artifacts import fs
+
+"""
+configuration of dispatchers and forecast groups. each dispatcher script and forecast group init file is parsed once
+into an immutable config object, cached by path and modification time. forecast groups listed by several
+dispatchers share the same config.
+"""
+
+DispatcherConfig = namedtuple('DispatcherConfig', ['script_name', 'config_file_name', 'waiting_period', 'group_paths'])
+
+GroupConfig = namedtuple('GroupConfig', ['group_path', 'group_name', 'group_description', 'config_filepath',
+                                         'models', 'forecast_dir', 'evaluation_tests', 'evaluation_schedule',
+                                         'forecast_schedule', 'result_dir', 'observation_dir', 'post_processing',
+                                         'entry_date_text'])
+
+# store the name of the hybrid and bayesian models
+hybridModel = 'hybridModel'
+genericModel = 'models'
+bayesianModel = 'BayesianModel'
+
+
+def parse_dispatcher(script_name):
+    """
+    reads dispatcher script and the dispatcher init file it refers to
+    :param script_name: path to the dispatcher script
+    :return: DispatcherConfig
+    """
+    para = fs.read_text(script_name).strip()
+
+    config_file_name = None
+    result = re.search(r'--configFile=(\S*)', para)
+    if result:
+        config_file_name = result.group(1)
+    else:
+        print('Warning: Could not parse config file name from dispatcher script')
+
+    waiting_period = None
+    result = re.search(r'waitingPeriod=(\S*)', para)
+    if result:
+        waiting_period = int(result.group(1))
+    else:
+        print('Warning: Could not parse waiting period from dispatcher script')
+
+    group_paths = ()
+    if config_file_name:
+        d = DispatcherInitFile(fs.local_path(config_file_name))
+        group_paths = tuple(elem.text for elem in d.elements('forecastGroup'))
+    return DispatcherConfig(script_name, config_file_name, waiting_period, group_paths)
+
+
+def parse_group(group_path):
+    """
+    reads forecast group init file <group_path>/forecast.init.xml
+    :param group_path: path of the top level folder to the forecast group
+    :return: GroupConfig
+    """
+    config_filepath = os.path.join(group_path, 'forecast.init.xml')
+    fg = ForecastGroupInitFile(os.path.dirname(fs.local_path(config_filepath)))
+
+    # name is stored as attribute on root, fails loudly
+    group_description = fg.root().attrib['name']
+
+    # models defined in models tag of config file, along with the hybrid and bayesian models
+    models = []
+    try:
+        generic_models = fg.elementValue(genericModel)
+        if generic_models:
+            models.extend(generic_models.split(' '))
+        for elem in fg.next(bayesianModel):
+            models.append(elem.attrib['name'])
+        for elem in fg.next(hybridModel):
+            models.append(elem.attrib['name'])
+    except(RuntimeError, KeyError):
+        print("Warning: Could not extract models from ForecastGroup {}."
+              .format(group_path))
+
+    tests = []
+    try:
+        for elem in fg.next('evaluationTests'):
+            if elem.text:
+                tests.extend(elem.text.strip().split(' '))
+    except AttributeError:
+        # print warning that no evaluation tests were found.
+        print("Warning: No evaluation tests found for ForecastGroup {}."
+              .format(group_path))
+
+    return GroupConfig(group_path=group_path,
+                       # name is assumed to be the basename of the path
+                       group_name=os.path.basename(group_path),
+                       group_description=group_description,
+                       config_filepath=config_filepath,
+                       models=tuple(models),
+                       forecast_dir=_group_dir(fg, group_path, 'forecastDir'),
+                       evaluation_tests=tuple(tests),
+                       evaluation_schedule=_schedule(fg, 'evaluationTests'),
+                       forecast_schedule=_schedule(fg, 'models'),
+                       result_dir=_group_dir(fg, group_path, 'resultDir'),
+                       observation_dir=_group_dir(fg, group_path, 'catalogDir'),
+                       post_processing=fg.elementValue('postProcessing'),
+                       entry_date_text=fg.elementValue('entryDate'))
+
+
+def _group_dir(fg, group_path, xml_tag):
+    # directories are relative to the forecast group, unless absolute
+    path = fg.elementValue(xml_tag)
+    if not path:
+        return ''
+    if os.path.isabs(path):
+        return path
+    return os.path.join(group_path, path)
+
+
+def _schedule(fg, xml_tag):
+    # CSEPSchedule objects of every element with the tag
+    schedule = []
+    try:
+        for elem in fg.next(xml_tag):
+            schedule.append(fg.schedule(elem))
+    except AttributeError:
+        return ()
+    return tuple(schedule)
+
+
+class ConfigCache:
+    """
+    maps path -> config, re-parsed when the modification time of any file the config was read from changes
+    """
+    def __init__(self, parse, files):
+        self.parse = parse
+        self.files = files
+        self.hits = 0
+        self.misses = 0
+        self._configs = {}
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """
+        :param path: path of the dispatcher script or forecast group
+        :return: config object
+        """
+        with self._lock:
+            cached = self._configs.get(path)
+        if cached is not None and cached[0] == self._stamp(cached[1]):
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        config = self.parse(path)
+        with self._lock:
+            self._configs[path] = (self._stamp(config), config)
+        return config
+
+    def clear(self):
+        with self._lock:
+            self._configs.clear()
+
+    def _stamp(self, config):
+        stamp = []
+        for filepath in self.files(config):
+            try:
+                stamp.append(fs.stat(filepath).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+
+_dispatchers = ConfigCache(parse_dispatcher, lambda config: (config.script_name, config.config_file_name or ''))
+_groups = ConfigCache(parse_group, lambda config: (config.config_filepath,))
+
+
+def load_dispatcher(script_name):
+    """
+    cached DispatcherConfig of a dispatcher script
+    :param script_name: path to the dispatcher script
+    :return: DispatcherConfig
+    """
+    return _dispatchers.load(script_name)
+
+
+def load_group(group_path):
+    """
+    cached GroupConfig of a forecast group
+    :param group_path: path of the top level folder to the forecast group
+    :return: GroupConfig
+    """
+    return _groups.load(group_path)
+
+
+def clear():
+    """
+    drops every cached config
+    :return: none
+    """
+    _dispatchers.clear()
+    _groups.clear()
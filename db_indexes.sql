@@ -0,0 +1,9 @@
+CREATE INDEX IF NOT EXISTS forecasts_status_name ON Forecasts (status, name);
+
+CREATE INDEX IF NOT EXISTS forecasts_schedule ON Forecasts (schedule_id);
+
+CREATE INDEX IF NOT EXISTS evaluations_status_name ON Evaluations (status, name, forecast_id);
+
+CREATE INDEX IF NOT EXISTS evaluations_forecast_status ON Evaluations (forecast_id, status);
+
+CREATE INDEX IF NOT EXISTS evaluations_schedule ON Evaluations (schedule_id);
@@ -51,3 +51,99 @@ CREATE TABLE IF NOT EXISTS Evaluations (
     FOREIGN KEY(forecast_id) REFERENCES Forecasts
     UNIQUE(forecast_id, name)
 );
+
+CREATE TABLE IF NOT EXISTS ScanStates (
+    scan_state_id INTEGER PRIMARY KEY,
+    group_path TEXT NOT NULL UNIQUE,
+    high_water_mark TEXT,
+    scan_datetime TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ScannedDays (
+    scanned_day_id INTEGER PRIMARY KEY,
+    group_path TEXT NOT NULL,
+    date_time TEXT NOT NULL,
+    archive_mtime INTEGER,
+    result_mtime INTEGER,
+    observation_mtime INTEGER,
+    UNIQUE(group_path, date_time)
+);
+
+CREATE TABLE IF NOT EXISTS ForecastStatusCounts (
+    group_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(group_id, name, month, status)
+);
+
+CREATE TABLE IF NOT EXISTS EvaluationStatusCounts (
+    group_id INTEGER NOT NULL,
+    forecast_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(group_id, forecast_name, name, month, status)
+);
+
+CREATE VIEW IF NOT EXISTS ForecastCountKeys AS
+    SELECT Forecasts.forecast_id AS forecast_id, Forecasts.group_id AS group_id, Forecasts.name AS name,
+           ifnull(substr(Schedules.date_time, 1, 7), '') AS month
+    FROM Forecasts LEFT JOIN Schedules ON Schedules.schedule_id=Forecasts.schedule_id;
+
+CREATE VIEW IF NOT EXISTS EvaluationCountKeys AS
+    SELECT Evaluations.evaluation_id AS evaluation_id, ifnull(Forecasts.group_id, 0) AS group_id,
+           ifnull(Forecasts.name, '') AS forecast_name, ifnull(Evaluations.name, '') AS name,
+           ifnull(substr(Schedules.date_time, 1, 7), '') AS month
+    FROM Evaluations LEFT JOIN Forecasts ON Forecasts.forecast_id=Evaluations.forecast_id
+    LEFT JOIN Schedules ON Schedules.schedule_id=Evaluations.schedule_id;
+
+CREATE TRIGGER IF NOT EXISTS forecast_counts_insert AFTER INSERT ON Forecasts
+BEGIN
+    INSERT INTO ForecastStatusCounts (group_id, name, month, status, count)
+        SELECT group_id, name, month, ifnull(NEW.status, ''), 1 FROM ForecastCountKeys WHERE forecast_id=NEW.forecast_id
+        ON CONFLICT(group_id, name, month, status) DO UPDATE SET count=count+excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS forecast_counts_delete BEFORE DELETE ON Forecasts
+BEGIN
+    INSERT INTO ForecastStatusCounts (group_id, name, month, status, count)
+        SELECT group_id, name, month, ifnull(OLD.status, ''), -1 FROM ForecastCountKeys WHERE forecast_id=OLD.forecast_id
+        ON CONFLICT(group_id, name, month, status) DO UPDATE SET count=count+excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS forecast_counts_update AFTER UPDATE OF status ON Forecasts WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO ForecastStatusCounts (group_id, name, month, status, count)
+        SELECT group_id, name, month, ifnull(OLD.status, ''), -1 FROM ForecastCountKeys WHERE forecast_id=NEW.forecast_id
+        ON CONFLICT(group_id, name, month, status) DO UPDATE SET count=count+excluded.count;
+    INSERT INTO ForecastStatusCounts (group_id, name, month, status, count)
+        SELECT group_id, name, month, ifnull(NEW.status, ''), 1 FROM ForecastCountKeys WHERE forecast_id=NEW.forecast_id
+        ON CONFLICT(group_id, name, month, status) DO UPDATE SET count=count+excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS evaluation_counts_insert AFTER INSERT ON Evaluations
+BEGIN
+    INSERT INTO EvaluationStatusCounts (group_id, forecast_name, name, month, status, count)
+        SELECT group_id, forecast_name, name, month, ifnull(NEW.status, ''), 1 FROM EvaluationCountKeys WHERE evaluation_id=NEW.evaluation_id
+        ON CONFLICT(group_id, forecast_name, name, month, status) DO UPDATE SET count=count+excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS evaluation_counts_delete BEFORE DELETE ON Evaluations
+BEGIN
+    INSERT INTO EvaluationStatusCounts (group_id, forecast_name, name, month, status, count)
+        SELECT group_id, forecast_name, name, month, ifnull(OLD.status, ''), -1 FROM EvaluationCountKeys WHERE evaluation_id=OLD.evaluation_id
+        ON CONFLICT(group_id, forecast_name, name, month, status) DO UPDATE SET count=count+excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS evaluation_counts_update AFTER UPDATE OF status ON Evaluations WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO EvaluationStatusCounts (group_id, forecast_name, name, month, status, count)
+        SELECT group_id, forecast_name, name, month, ifnull(OLD.status, ''), -1 FROM EvaluationCountKeys WHERE evaluation_id=NEW.evaluation_id
+        ON CONFLICT(group_id, forecast_name, name, month, status) DO UPDATE SET count=count+excluded.count;
+    INSERT INTO EvaluationStatusCounts (group_id, forecast_name, name, month, status, count)
+        SELECT group_id, forecast_name, name, month, ifnull(NEW.status, ''), 1 FROM EvaluationCountKeys WHERE evaluation_id=NEW.evaluation_id
+        ON CONFLICT(group_id, forecast_name, name, month, status) DO UPDATE SET count=count+excluded.count;
+END;
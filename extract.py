@@ -1,18 +1,20 @@
 import os
-import sqlite3
+import argparse
+import cProfile
+import pstats
 from artifacts.create import create_schema
-from models import Dispatchers
+from artifacts.session import profiles
+from artifacts import snapshot, profiling
+from models import BulkInserter
+from extraction import extract
 
 # create database
 db_name = 'csep_db_one-day-models-07-12-catalog-debug-v4.sql3'
 
-try:
-    os.remove(db_name)
-except FileNotFoundError:
-    pass
-
 sql_statements = 'db_schema.sql'
-db = create_schema(sql_statements, db_name)
+
+# secondary indexes, built once a full extraction is done, kept by incremental ones
+index_statements = 'db_indexes.sql'
 
 # start with ANSS one-day catalogs
 dispatchers = ['/usr/local/csep/cronjobs/dispatcher_ANSS1985_one_day.tcsh',
@@ -20,12 +22,71 @@ dispatchers = ['/usr/local/csep/cronjobs/dispatcher_ANSS1985_one_day.tcsh',
                '/usr/local/csep/cronjobs/dispatcher_ANSS1932_notFiltered_Md2_one_day.tcsh',
                '/usr/local/csep/cronjobs/dispatcher_ANSS1985_forecasts.tcsh']
 
-for dispatcher in dispatchers:
-    dispatcher = Dispatchers(dispatcher, conn=db)
-    for group in dispatcher.forecast_groups():
-        # first handle the forecasts and evaluations
-        for forecast in group.forecasts():
-            for evaluation in forecast.evaluations():
-                evaluation.insert()
-        db.commit()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='extract forecasts and evaluations from a CSEP testing center')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes scanning forecast groups (default: 1)')
+    parser.add_argument('--db', default=db_name, help='path to the sqlite3 database')
+    parser.add_argument('--incremental', action='store_true',
+                        help='update an existing database, only rescanning days that changed since the last run')
+    parser.add_argument('--profile', default='safe', choices=sorted(profiles),
+                        help='sqlite3 pragma profile, every profile except legacy lets queries read during the '
+                             'extraction (default: safe)')
+    parser.add_argument('--commit-size', type=int, default=None,
+                        help='commit every N rows instead of once per forecast group')
+    parser.add_argument('--rescan-archive', action='store_true',
+                        help='list every forecast archive again instead of using the stored forecast name catalogs')
+    parser.add_argument('--create-snapshot', metavar='MANIFEST',
+                        help='crawl the dispatchers and forecast groups into a snapshot manifest and exit')
+    parser.add_argument('--snapshot', metavar='MANIFEST',
+                        help='extract from a snapshot manifest instead of the live filesystem')
+    parser.add_argument('--async-io', type=int, metavar='THREADS',
+                        help='prefetch directory listings and meta files of the next days concurrently with THREADS '
+                             'threads, for network filesystems')
+    parser.add_argument('--in-flight', type=int, default=256,
+                        help='maximum number of filesystem calls in flight with --async-io (default: 256)')
+    parser.add_argument('--timings', action='store_true',
+                        help='report wall time, calls and bytes per phase and filesystem calls for every forecast group')
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help='profile the extraction with cProfile and write the pstats dump to FILE, worker processes '
+                             'are not profiled')
+    args = parser.parse_args()
+
+    if args.create_snapshot:
+        entries = snapshot.create(args.create_snapshot, dispatchers)
+        print('{} entries written to {}'.format(entries, args.create_snapshot))
+        raise SystemExit(0)
+    if args.snapshot:
+        snapshot.load(args.snapshot)
+
+    # full extractions start from an empty database, a write-ahead log left by a killed run would be replayed onto it
+    if not args.incremental:
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(args.db + suffix)
+            except FileNotFoundError:
+                pass
+
+    db = create_schema(sql_statements, args.db, profile=args.profile)
+
+    if args.timings:
+        profiling.enable()
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler is not None:
+        profiler.enable()
+
+    # buffer rows and write them in batches
+    writer = BulkInserter(db)
+    extract(db, writer, dispatchers, workers=args.workers, incremental=args.incremental,
+            commit_size=args.commit_size, index_statements=index_statements, trigger_statements=sql_statements,
+            rescan=args.rescan_archive, prefetch=(args.async_io, args.in_flight) if args.async_io else None)
+    # checkpoints the write-ahead log and removes it
+    db.close()
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    if args.timings:
+        print(profiling.report())
@@ -0,0 +1,448 @@
+import os
+from collections import OrderedDict
+from datetime import datetime
+from multiprocessing import Pool
+from models import Dispatchers, ForecastGroups, Evaluations, StatusClassifier
+from records import GroupRecord, ForecastRecord, EvaluationRecord
+import configs
+import summaries
+from artifacts import fs, snapshot, profiling
+from artifacts.prefetch import Prefetcher
+from artifacts.session import Session
+from artifacts.create import drop_indexes, create_indexes, drop_triggers, create_triggers
+
+"""
+extraction engine. forecast groups are split into shards of consecutive dates, each shard is scanned by a worker
+process and the records are sent back to a single writer that owns the sqlite3 connection. shards are written in
+the same order as the serial crawl, so the database is identical for any number of workers.
+
+incremental extractions keep the directory modification times of every scanned day in the database and only
+rebuild the days that changed, or that could still change because their status is pending.
+
+on high-latency filesystems the directories of the next days can be prefetched concurrently while a day is
+scanned, see artifacts/prefetch.py.
+"""
+
+# number of forecast groups kept by each worker between shards
+worker_group_cache_size = 4
+
+
+class Shard:
+    """
+    unit of work for a worker, covering dates in [start_date, end_date) of one forecast group. dates set to None
+    are unbounded. if dates is given, only those days are scanned.
+    """
+    def __init__(self, dispatcher_index, group_index, script_name, group_path, start_date=None, end_date=None,
+                 dates=None):
+        self.dispatcher_index = dispatcher_index
+        self.group_index = group_index
+        self.script_name = script_name
+        self.group_path = group_path
+        self.start_date = start_date
+        self.end_date = end_date
+        self.dates = dates
+
+    @property
+    def group_key(self):
+        return self.dispatcher_index, self.group_index
+
+
+def shards(dispatchers, dates=None, end_date=None):
+    """
+    splits every forecast group of the dispatchers into one shard per calendar year of its schedule
+    :param dispatchers: list of Dispatchers
+    :param dates: optional, set of date strings YYYY-MM-DD to scan. shards without any of these dates are skipped
+    :param end_date: optional, end of the schedules, today if not given
+    :return: generator of Shard objects, in the order of the serial crawl
+    """
+    end_date = ForecastGroups.end_date or end_date or datetime.today()
+    for dispatcher_index, dispatcher in enumerate(dispatchers):
+        for group_index, group_path in enumerate(dispatcher.group_paths()):
+            entry_date_text = configs.load_group(group_path).entry_date_text
+            bounds = [None]
+            if entry_date_text:
+                entry_date = datetime.strptime(entry_date_text, '%Y-%m-%d %H:%M:%S')
+                bounds.extend(datetime(year, 1, 1) for year in range(entry_date.year + 1, end_date.year + 1))
+            bounds.append(None)
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                shard_dates = None
+                if dates is not None:
+                    shard_dates = frozenset(d for d in dates if (start is None or d >= str(start.date()))
+                                            and (end is None or d < str(end.date())))
+                    if not shard_dates:
+                        continue
+                yield Shard(dispatcher_index, group_index, dispatcher.script_name, group_path, start, end,
+                            shard_dates)
+
+
+def day_state(group, date, archive_mtimes):
+    """
+    modification times of the directories holding forecasts, evaluations and catalogs of a scheduled day
+    :param group: ForecastGroups object
+    :param date: datetime of the day
+    :param archive_mtimes: dict used to cache the times of monthly archive directories
+    :return: tuple (archive_mtime, result_mtime, observation_mtime), None for missing directories
+    """
+    archive_dir = os.path.join(group.forecast_dir, 'archive', date.strftime("%Y_%-m"))
+    if archive_dir not in archive_mtimes:
+        archive_mtimes[archive_dir] = _mtime(archive_dir)
+    day = date.strftime('%Y-%m-%d')
+    return (archive_mtimes[archive_dir],
+            _mtime(os.path.join(group.result_dir, day)),
+            _mtime(os.path.join(group.observation_dir, day)))
+
+
+def _mtime(path):
+    try:
+        return fs.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ScanState:
+    """
+    stores the high-water mark of each forecast group and the directory modification times of every scanned day,
+    so an incremental extraction only rescans days that changed since the last run.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+
+    def high_water_mark(self, group_path):
+        cursor = self.conn.cursor()
+        cursor.execute('select high_water_mark from ScanStates where group_path=?', (group_path,))
+        result = cursor.fetchone()
+        if result:
+            return result[0]
+        return None
+
+    def days(self, group_path):
+        """
+        :param group_path: path of the forecast group
+        :return: dict mapping date_time -> (archive_mtime, result_mtime, observation_mtime)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('select date_time, archive_mtime, result_mtime, observation_mtime from ScannedDays '
+                       'where group_path=?', (group_path,))
+        return dict((result[0], tuple(result[1:])) for result in cursor)
+
+    def changed_dates(self, group_path, current):
+        """
+        days beyond the high-water mark of the group, or days whose directories changed since they were scanned
+        :param group_path: path of the forecast group
+        :param current: dict mapping date_time -> directory modification times
+        :return: set of date_time strings
+        """
+        high_water_mark = self.high_water_mark(group_path)
+        recorded = self.days(group_path)
+        return set(date_time for date_time, state in current.items()
+                   if high_water_mark is None or date_time > high_water_mark or recorded.get(date_time) != state)
+
+    def pending_dates(self, today):
+        """
+        days that still have scheduled forecasts, evaluations or catalogs, or missing ones within the waiting period
+        :param today: date string YYYY-MM-DD used as the reference date
+        :return: set of date_time strings
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""select Schedules.date_time from Forecasts
+                          join Schedules on Forecasts.schedule_id=Schedules.schedule_id
+                          where Forecasts.status='Scheduled' or (Forecasts.status='Missing' and
+                          Schedules.date_time > date(?, '-' || Forecasts.waiting_period || ' days'))
+                          union
+                          select Schedules.date_time from Evaluations
+                          join Forecasts on Evaluations.forecast_id=Forecasts.forecast_id
+                          join Schedules on Evaluations.schedule_id=Schedules.schedule_id
+                          where Evaluations.status='Scheduled' or Evaluations.catalog_status='Scheduled' or
+                          (Evaluations.status='Missing' and
+                          Schedules.date_time > date(?, '-' || Forecasts.waiting_period || ' days'))""",
+                       (today, today))
+        return set(result[0] for result in cursor)
+
+    def delete_rows(self, dates):
+        """
+        removes forecasts and evaluations of days that will be rescanned
+        :param dates: collection of date_time strings
+        :return: none
+        """
+        cursor = self.conn.cursor()
+        params = [(date_time,) for date_time in dates]
+        cursor.executemany('delete from Evaluations where schedule_id in '
+                           '(select schedule_id from Schedules where date_time=?)', params)
+        cursor.executemany('delete from Forecasts where schedule_id in '
+                           '(select schedule_id from Schedules where date_time=?)', params)
+
+    def record(self, group_path, states, high_water_mark):
+        """
+        stores directory modification times of scanned days and the new high-water mark of the group
+        :param group_path: path of the forecast group
+        :param states: dict mapping date_time -> directory modification times
+        :param high_water_mark: last scheduled date_time of the group
+        :return: none
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany('insert or replace into ScannedDays (group_path, date_time, archive_mtime, result_mtime, '
+                           'observation_mtime) values (?, ?, ?, ?, ?)',
+                           [(group_path, date_time) + state for date_time, state in states.items()])
+        cursor.execute('insert or replace into ScanStates (group_path, high_water_mark, scan_datetime) '
+                       'values (?, ?, ?)', (group_path, high_water_mark, str(datetime.today())))
+
+
+_groups = OrderedDict()
+_now = None
+_prefetcher = None
+
+
+def _init_worker(now=None, snapshot_filename=None, profile=False, prefetch=None):
+    global _now, _prefetcher
+    _groups.clear()
+    _close_prefetcher()
+    if prefetch:
+        _prefetcher = Prefetcher(*prefetch)
+    if profile and not profiling.enabled():
+        profiling.enable()
+    # statuses of the whole extraction are decided against the same time
+    _now = now
+    # workers that were not forked start on the live filesystem
+    current = fs.snapshot()
+    if snapshot_filename and (current is None or current.filename != snapshot_filename):
+        snapshot.load(snapshot_filename)
+
+
+def _close_prefetcher():
+    global _prefetcher
+    if _prefetcher is not None:
+        _prefetcher.close()
+        _prefetcher = None
+
+
+def _group(script_name, group_path):
+    key = (script_name, group_path)
+    group = _groups.get(key)
+    if group is None:
+        with profiling.phase('dispatchers'):
+            dispatcher = Dispatchers(script_name)
+        with profiling.phase('groups'):
+            group = ForecastGroups(group_path, dispatcher, status_classifier=StatusClassifier(_now))
+        _groups[key] = group
+        if len(_groups) > worker_group_cache_size:
+            _groups.popitem(last=False)
+    return group
+
+
+def scan(shard):
+    """
+    scans forecasts and evaluations of one shard. models are turned into records as soon as they are built, so
+    only the records of the shard are held in memory. every forecast of the models schedule is returned, forecasts
+    on days outside the evaluation schedule have no evaluations.
+    :param shard: Shard object
+    :return: tuple (GroupRecord, list of ForecastRecord, profiling stats of the shard or None)
+    """
+    profiling.group(os.path.basename(shard.group_path))
+    group = _group(shard.script_name, shard.group_path)
+    records = []
+    # same as group.forecasts(), a day is built once its directories are prefetched
+    schedules = group.schedule(shard.start_date, shard.end_date, shard.dates)
+    if _prefetcher is not None:
+        schedules = _prefetcher.prefetched(schedules, group.prefetch_requests)
+    for schedule in schedules:
+        for forecast in group.scheduled_forecasts(schedule):
+            evaluations = [EvaluationRecord.from_model(evaluation) for evaluation in forecast.evaluations()]
+            records.append(ForecastRecord.from_model(forecast, evaluations))
+    # the stats travel with the records, so workers report to the writing process
+    return GroupRecord.from_model(group), records, profiling.drain()
+
+
+class Writer:
+    """
+    writes records produced by scan() through a BulkInserter. dispatchers, groups and schedules are written once a
+    forecast refers to them, and the forecasts of a shard before its evaluations. rowids follow the same order as
+    inserting each evaluation with Model.insert().
+    """
+    def __init__(self, inserter, dispatchers):
+        self.inserter = inserter
+        self.dispatchers = dispatchers
+        self._group_rowids = {}
+
+    def write(self, shard, group, forecasts):
+        """
+        buffers records of a scanned shard
+        :param shard: Shard object
+        :param group: GroupRecord of the forecast group
+        :param forecasts: list of ForecastRecord
+        :return: none
+        """
+        # rows of earlier extractions are only looked up for the forecasts of the shard
+        self.inserter.load_keys('Forecasts', ('filepath',), (forecast.filepath for forecast in forecasts))
+        forecast_rowids = [self._forecast(shard, group, forecast) for forecast in forecasts]
+        self.inserter.load_keys('Evaluations', ('forecast_id', 'name'), forecast_rowids, track=('status',))
+        for forecast, forecast_rowid in zip(forecasts, forecast_rowids):
+            for evaluation in forecast.evaluations:
+                values = OrderedDict()
+                values['schedule_id'] = self._schedule(forecast.date_time)
+                values['forecast_id'] = forecast_rowid
+                values.update(self._text(evaluation))
+                Evaluations.bulk_insert_values(self.inserter, values)
+
+    def _schedule(self, date_time):
+        row = self.inserter.add('Schedules', OrderedDict([('date_time', date_time)]), key_columns=('date_time',))
+        return row['rowid']
+
+    def _forecast(self, shard, group, forecast):
+        row = self.inserter.find('Forecasts', ('filepath',), (forecast.filepath,))
+        if row is not None:
+            return row['rowid']
+        values = OrderedDict()
+        values['schedule_id'] = self._schedule(forecast.date_time)
+        values['group_id'] = self._group(shard, group)
+        values.update(self._text(forecast))
+        return self.inserter.add('Forecasts', values, key_columns=('filepath',))['rowid']
+
+    def _group(self, shard, group):
+        rowid = self._group_rowids.get(shard.group_key)
+        if rowid is None:
+            values = OrderedDict()
+            values['dispatcher_id'] = self.inserter.insert(self.dispatchers[shard.dispatcher_index])
+            values.update(self._text(group))
+            # groups written by a previous extraction are reused
+            rowid = self.inserter.add('ForecastGroups', values, key_columns=('dispatcher_id', 'group_path'))['rowid']
+            self._group_rowids[shard.group_key] = rowid
+        return rowid
+
+    @staticmethod
+    def _text(record):
+        # values are stored as text, the same as Model.insert()
+        return ((field, str(value)) for field, value in record.values().items())
+
+
+def extract(conn, inserter, scripts, workers=1, incremental=False, commit_size=None, index_statements=None,
+            trigger_statements=None, rescan=False, prefetch=None, now=None):
+    """
+    extracts forecasts and evaluations for every forecast group of the dispatchers into the database
+    :param conn: sqlite3 connection of the writer
+    :param inserter: BulkInserter bound to conn
+    :param scripts: list of paths to dispatcher scripts
+    :param workers: number of worker processes, 1 scans in this process
+    :param incremental: only rescan days that changed since the last extraction into this database
+    :param commit_size: commit every commit_size rows, by default commits once per forecast group
+    :param index_statements: path to SQL file of secondary indexes. full extractions drop them while loading and
+                             build them at the end, incremental extractions only create missing ones and keep them
+    :param trigger_statements: path to SQL file of the summary triggers. full extractions drop them while loading,
+                               rebuild the status summaries once and create them at the end, incremental extractions
+                               keep them
+    :param rescan: list every forecast archive again instead of trusting the stored forecast name catalogs
+    :param prefetch: optional, tuple (threads, in_flight) to prefetch the directories of every shard with that many
+                     threads and at most in_flight calls at once, in each worker
+    :param now: optional, datetime the statuses are decided against, by default the time the extraction starts
+    :return: none
+    """
+    now = now or datetime.today()
+    session = Session(conn, inserter, commit_size)
+    profiling.group('')
+    with profiling.phase('dispatchers'):
+        dispatchers = [Dispatchers(script, conn=conn) for script in scripts]
+    writer = Writer(inserter, dispatchers)
+    state = ScanState(conn)
+
+    # directory modification times of every scheduled day, per forecast group
+    current = OrderedDict()
+    for dispatcher in dispatchers:
+        for group_path in dispatcher.group_paths():
+            if group_path not in current:
+                profiling.group(os.path.basename(group_path))
+                with profiling.phase('groups'):
+                    group = ForecastGroups(group_path, dispatcher, status_classifier=StatusClassifier(now))
+                    # attributes are parsed lazily, the forecast name catalog is brought up to date before the
+                    # workers start
+                    group.parse_expected_forecasts(rescan)
+                archive_mtimes = {}
+                with profiling.phase('day states'):
+                    current[group_path] = OrderedDict((date.strftime('%Y-%m-%d'),
+                                                       day_state(group, date, archive_mtimes))
+                                                      for date in group.compiled_schedule().dates())
+    profiling.group('')
+
+    # full loads drop the summary triggers and summarize once at the end. incremental runs keep them, so only the
+    # rows of the rescanned days are counted
+    rebuild_summaries = bool(trigger_statements) and not incremental
+    # the same for secondary indexes, incremental runs only write a few days and keep queries indexed meanwhile
+    rebuild_indexes = bool(index_statements) and not incremental
+    dates = None
+    if incremental:
+        # databases from before the summary tables existed are summarized once
+        if summaries.is_stale(conn):
+            summaries.rebuild(conn)
+        if trigger_statements:
+            create_triggers(trigger_statements, conn)
+        if index_statements:
+            with profiling.phase('indexes'):
+                create_indexes(index_statements, conn, analyze=False)
+        dates = set()
+        for group_path, states in current.items():
+            dates.update(state.changed_dates(group_path, states))
+        dates.update(state.pending_dates(now.strftime('%Y-%m-%d')))
+        # changed days are rebuilt for every group, in the order of the serial crawl
+        state.delete_rows(dates)
+    # rows load faster without secondary indexes
+    if rebuild_indexes:
+        drop_indexes(index_statements, conn)
+    if rebuild_summaries:
+        drop_triggers(trigger_statements, conn)
+
+    pool = None
+    failed = True
+    try:
+        tasks = list(shards(dispatchers, dates, now))
+        if workers > 1:
+            source = fs.snapshot()
+            pool = Pool(workers, initializer=_init_worker,
+                        initargs=(now, source.filename if source else None, profiling.enabled(), prefetch))
+            results = pool.imap(scan, tasks)
+        else:
+            _init_worker(now, prefetch=prefetch)
+            results = map(scan, tasks)
+
+        current_group = None
+        for shard, (group, forecasts, stats) in zip(tasks, results):
+            # in this process the drained stats are simply put back
+            profiling.merge(stats)
+            profiling.group(os.path.basename(shard.group_path))
+            with profiling.phase('inserts'):
+                if current_group is not None and shard.group_key != current_group:
+                    session.group_done()
+                current_group = shard.group_key
+                writer.write(shard, group, forecasts)
+                session.written()
+        profiling.group('')
+        with profiling.phase('inserts'):
+            inserter.flush()
+
+        for group_path, states in current.items():
+            if dates is not None:
+                states = OrderedDict((date_time, s) for date_time, s in states.items() if date_time in dates)
+            high_water_mark = max(current[group_path]) if current[group_path] else None
+            state.record(group_path, states, high_water_mark)
+        with profiling.phase('inserts'):
+            conn.commit()
+        failed = False
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        else:
+            _close_prefetcher()
+        # restored even if the extraction failed, so status queries stay indexed and the summaries keep counting
+        # later writes
+        try:
+            conn.rollback()
+            if rebuild_indexes:
+                with profiling.phase('indexes'):
+                    create_indexes(index_statements, conn)
+            if rebuild_summaries:
+                with profiling.phase('summaries'):
+                    summaries.rebuild(conn)
+                    create_triggers(trigger_statements, conn)
+        except Exception as e:
+            if not failed:
+                raise
+            # the error of the extraction is the one raised
+            print("Warning: unable to restore indexes and summaries after the failed extraction: {}".format(e))
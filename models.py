@@ -1,12 +1,13 @@
 import os
 import re
-import glob
 import sqlite3
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from ForecastGroupInitFile import ForecastGroupInitFile
-from DispatcherInitFile import DispatcherInitFile
 from artifacts.utils import text_to_datetime
+from artifacts import dircache, metafile, forecastnames, profiling
+from artifacts.prefetch import Request
+import configs
 
 """
 
@@ -17,10 +18,18 @@ TODO: 1) debug and propagate changes to models in api
 
 
 class Schedule:
-    end_date = datetime(2019, 1, 1, 0, 0, 0)
-
-    def __init__(self, start_date=None):
+    """
+    compiles the CSEP schedules of a forecast group into the list of scheduled dates. days run from the start date up
+    to the end date, today if not given. a day is scheduled if any of the schedules has it, groups without usable
+    schedules are scheduled daily.
+    """
+    def __init__(self, start_date=None, schedules=(), end_date=None):
         self.start_date = start_date
+        self.end_date = end_date or datetime.today()
+        # CSEPSchedule objects, anything without has(date) is ignored
+        self.schedules = [schedule for schedule in schedules if hasattr(schedule, 'has')]
+        self._dates = None
+        self._date_set = None
 
     def date_range(self, days=1, months=0, years=0):
         date = self.start_date
@@ -31,6 +40,148 @@ class Schedule:
         else:
             return iter([])
 
+    def dates(self):
+        """
+        scheduled dates, compiled on first use
+        :return: list of datetime
+        """
+        if self._dates is None:
+            if self.schedules:
+                self._dates = [date for date in self.date_range()
+                               if any(schedule.has(date) for schedule in self.schedules)]
+            else:
+                self._dates = list(self.date_range())
+        return self._dates
+
+    def has(self, date):
+        """
+        :param date: datetime
+        :return: (bool) True if date is scheduled
+        """
+        if self._date_set is None:
+            self._date_set = frozenset(self.dates())
+        return date in self._date_set
+
+
+class StatusClassifier:
+    """
+    decides which missing forecasts, evaluations and catalogs are still scheduled. every decision is taken against
+    the same reference time, and the cut-off date of each waiting period is only computed once.
+    """
+    def __init__(self, now=None):
+        self.now = now or datetime.today()
+        self._cutoffs = {}
+
+    def cutoff(self, waiting_period, offset=0):
+        """
+        :param waiting_period: days to wait for a product, int or numeric string
+        :param offset: days added to the waiting period, evaluations and catalogs use -1
+        :return: datetime, missing products scheduled after the cut-off are still expected
+        """
+        key = (waiting_period, offset)
+        cutoff = self._cutoffs.get(key)
+        if cutoff is None:
+            cutoff = self.now - timedelta(days=int(waiting_period) + offset)
+            self._cutoffs[key] = cutoff
+        return cutoff
+
+    def is_scheduled(self, date, waiting_period, offset=0):
+        """
+        :param date: scheduled datetime of the product
+        :param waiting_period: days to wait for a product
+        :param offset: days added to the waiting period
+        :return: (bool) True if a missing product is still expected
+        """
+        return date > self.cutoff(waiting_period, offset)
+
+    def status(self, date, exists, waiting_period, offset=0, present='Complete'):
+        """
+        status of a forecast, evaluation or catalog
+        :param date: scheduled datetime of the product
+        :param exists: (bool) True if the product exists
+        :param waiting_period: days to wait for a product, only used when it does not exist
+        :param offset: days added to the waiting period
+        :param present: status of products that exist
+        :return: present, 'Scheduled' or 'Missing'
+        """
+        if exists:
+            return present
+        return 'Scheduled' if self.is_scheduled(date, waiting_period, offset) else 'Missing'
+
+    def classify(self, dates, found, waiting_periods, offset=0, present='Complete'):
+        """
+        status of many products in one pass, eg., the forecasts of a scheduled date
+        :param dates: sequence of scheduled datetimes
+        :param found: sequence of (bool) True if the product exists
+        :param waiting_periods: sequence of waiting periods, only used for products that do not exist
+        :param offset: days added to the waiting periods
+        :param present: status of products that exist
+        :return: list of status, present, 'Scheduled' or 'Missing'
+        """
+        cutoffs = self._cutoffs
+        statuses = []
+        for date, exists, waiting_period in zip(dates, found, waiting_periods):
+            if exists:
+                statuses.append(present)
+                continue
+            cutoff = cutoffs.get((waiting_period, offset))
+            if cutoff is None:
+                cutoff = self.cutoff(waiting_period, offset)
+            statuses.append('Scheduled' if date > cutoff else 'Missing')
+        return statuses
+
+
+class SchemaRegistry:
+    """
+    column names of each table, loaded once per connection and table with PRAGMA table_info and shared between
+    all Model instances. connections can not be weakly referenced, so the registry keeps the most recently used
+    connections and checks identity before reusing their columns.
+    """
+    max_connections = 8
+
+    def __init__(self):
+        self._schemas = OrderedDict()
+
+    def columns(self, conn, table):
+        """
+        return list of column names of a table, including the private key
+        :param conn: sqlite3 connection
+        :param table: name of the table
+        :return: list of column names
+        :raises: sqlite3.OperationalError if the table does not exist
+        """
+        entry = self._schemas.get(id(conn))
+        if entry is None or entry[0] is not conn:
+            entry = (conn, {})
+            self._schemas[id(conn)] = entry
+            if len(self._schemas) > self.max_connections:
+                self._schemas.popitem(last=False)
+        self._schemas.move_to_end(id(conn))
+
+        tables = entry[1]
+        if table not in tables:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA table_info({})".format(table))
+            columns = [result[1] for result in cursor]
+            if not columns:
+                raise sqlite3.OperationalError("no such table: {}".format(table))
+            tables[table] = columns
+        return tables[table]
+
+    def invalidate(self, conn=None):
+        """
+        drops cached columns of a connection, or of every connection if conn is None. needed after altering tables.
+        :param conn: sqlite3 connection
+        :return: none
+        """
+        if conn is None:
+            self._schemas.clear()
+        else:
+            self._schemas.pop(id(conn), None)
+
+
+schema_registry = SchemaRegistry()
+
 
 class Model:
 
@@ -157,12 +308,10 @@ class Model:
         if not self.conn:
             raise RuntimeError("Db connection must be bound to Model instance to retrieve fields.")
 
-        cursor = self.conn.cursor()
-        cursor.execute("select * from {}".format(self.table))
-        fields = [f[0] for f in cursor.description]
+        fields = schema_registry.columns(self.conn, self.table)
 
         if self._table_type == 'join':
-            return fields
+            return list(fields)
         # ignore private key, unless join table
         return fields[1:]
 
@@ -187,9 +336,203 @@ class Model:
             print("Error: Unable to retrieve attributes. Ensure that {} has attributes corresponding to DB fields."
                   .format(self.table))
 
+    def _bulk_insert(self, writer, values):
+        """
+        buffers model in a BulkInserter. rows are matched on the unique columns of the model, if any.
+        :param writer: BulkInserter instance
+        :param values: dict mapping field -> value with foreign keys resolved
+        :return: rowid of the model
+        """
+        row = writer.add(self.table, values, key_columns=tuple(self._unique_columns))
+        return row['rowid']
+
+
+class BulkInserter:
+    """
+    buffers rows per table and writes them with executemany using bound parameters.
+
+    rowids are allocated in memory and unique keys are kept in a map of key -> rowid, so foreign keys can be
+    resolved without querying the database for every dependency. keys of rows already in the database are only
+    loaded for the values of the first key column that are looked up, with the index of the unique constraint, see
+    load_keys(). values are stored as text, the same as Model.insert(). tables are flushed in the order they were
+    first seen, which inserts dependencies first.
+    """
+    # values of the first key column per query, below the parameter limit of sqlite3
+    lookup_size = 500
+
+    def __init__(self, conn, batch_size=10000):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.count = 0
+        self._inserts = OrderedDict()
+        self._updates = OrderedDict()
+        self._pending = 0
+        self._next_rowid = {}
+        self._keys = {}
+
+    def insert(self, model):
+        """
+        buffers model and, recursively, all models it references
+        :param model: Model instance bound to a connection
+        :return: rowid of the model
+        """
+        if model._inserted:
+            return model.insert_id
+
+        if not model.fields or not model.table:
+            raise RuntimeError("Cannot insert values into db unless connection object is bound to Model instance.")
+
+        # existing rows are reused without inserting their dependencies
+        if model._unique_columns:
+            key_columns = tuple(model._unique_columns)
+            row = self.find(model.table, key_columns, [getattr(model, column) for column in key_columns])
+            if row is not None:
+                model._insert_id = row['rowid']
+                model._inserted = True
+                return model.insert_id
+
+        values = OrderedDict()
+        for field, value in model._db_values():
+            if isinstance(value, Model):
+                value = self.insert(value)
+            values[field] = str(value)
+
+        model._insert_id = model._bulk_insert(self, values)
+        model._inserted = True
+        return model.insert_id
+
+    def find(self, table, key_columns, key, track=()):
+        """
+        looks up row by unique key, loading the keys already in the database on first use of the table
+        :param table: name of table
+        :param key_columns: tuple of columns forming the key
+        :param key: tuple of values
+        :param track: columns whose values are kept alongside the rowid
+        :return: dict with rowid and tracked columns, None if not found
+        """
+        return self._lookup(table, key_columns, tuple(str(k) for k in key), track)
+
+    def add(self, table, values, key_columns=(), track=()):
+        """
+        buffers a new row unless a row with the same key exists
+        :param table: name of table
+        :param values: dict mapping field -> value
+        :param key_columns: tuple of columns forming a unique key, empty if none
+        :param track: columns whose values are kept alongside the rowid
+        :return: dict with rowid and tracked columns of the new or existing row
+        """
+        key = None
+        if key_columns:
+            key = tuple(str(values[column]) for column in key_columns)
+            row = self._lookup(table, key_columns, key, track)
+            if row is not None:
+                return row
+
+        rowid = self._allocate_rowid(table)
+        row = {'rowid': rowid}
+        for column in track:
+            row[column] = values[column]
+        if key_columns:
+            self._keys[(table, key_columns)][0][key] = row
+
+        fields = tuple(values.keys())
+        self._inserts.setdefault((table, fields), []).append((rowid,) + tuple(values.values()))
+        self._row_buffered()
+        return row
+
+    def load_keys(self, table, key_columns, scope, track=()):
+        """
+        loads the keys of existing rows whose first key column has one of the values in scope, eg., the evaluations
+        of the forecasts about to be written. values already loaded are skipped, so this only costs a few indexed
+        queries per batch instead of a lookup per row.
+        :param table: name of table
+        :param key_columns: tuple of columns forming the key
+        :param scope: iterable of values of the first key column
+        :param track: columns whose values are kept alongside the rowid
+        :return: none
+        """
+        keys, loaded = self._key_state(table, key_columns)
+        if loaded is None:
+            return
+        values = []
+        for value in scope:
+            value = str(value)
+            if value not in loaded:
+                loaded.add(value)
+                values.append(value)
+        columns = key_columns + tuple(track)
+        cursor = self.conn.cursor()
+        for i in range(0, len(values), self.lookup_size):
+            chunk = values[i:i + self.lookup_size]
+            cursor.execute("select rowid, {} from {} where {} in ({})".format(
+                ', '.join(columns), table, key_columns[0], ', '.join('?' * len(chunk))), chunk)
+            for result in cursor:
+                row = {'rowid': result[0]}
+                row.update(zip(track, result[1 + len(key_columns):]))
+                # rows buffered or updated by this inserter are newer than the database
+                keys.setdefault(tuple(str(k) for k in result[1:1 + len(key_columns)]), row)
+
+    def update(self, table, values, rowid):
+        """
+        buffers an update of an existing row
+        :param table: name of table
+        :param values: dict mapping field -> value
+        :param rowid: rowid of the row to update
+        :return: none
+        """
+        fields = tuple(values.keys())
+        self._updates.setdefault((table, fields), []).append(tuple(values.values()) + (rowid,))
+        self._row_buffered()
+
+    def flush(self):
+        """
+        writes all buffered rows. does not commit.
+        :return: none
+        """
+        cursor = self.conn.cursor()
+        for (table, fields), rows in self._inserts.items():
+            cursor.executemany("INSERT OR IGNORE INTO {0} (rowid, {1}) VALUES ({2})"
+                               .format(table, ', '.join(fields), ', '.join('?' * (len(fields) + 1))), rows)
+        for (table, fields), rows in self._updates.items():
+            cursor.executemany("UPDATE {0} SET {1} WHERE rowid=?"
+                               .format(table, ', '.join('{}=?'.format(f) for f in fields)), rows)
+        self._inserts.clear()
+        self._updates.clear()
+        self._pending = 0
+
+    def _row_buffered(self):
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def _allocate_rowid(self, table):
+        if table not in self._next_rowid:
+            cursor = self.conn.cursor()
+            cursor.execute("select max(rowid) from {}".format(table))
+            self._next_rowid[table] = (cursor.fetchone()[0] or 0) + 1
+        rowid = self._next_rowid[table]
+        self._next_rowid[table] += 1
+        return rowid
+
+    def _key_state(self, table, key_columns):
+        # [key -> row, values of the first key column loaded from the database]. tables that are empty when first
+        # used have nothing to load, their set is None
+        state = self._keys.get((table, key_columns))
+        if state is None:
+            cursor = self.conn.cursor()
+            cursor.execute("select exists (select 1 from {})".format(table))
+            state = self._keys[(table, key_columns)] = [{}, set() if cursor.fetchone()[0] else None]
+        return state
+
+    def _lookup(self, table, key_columns, key, track):
+        keys, loaded = self._key_state(table, key_columns)
+        if loaded is not None and key[0] not in loaded:
+            self.load_keys(table, key_columns, (key[0],), track)
+        return keys.get(key)
+
 
 class Schedules(Model):
-    end_date = datetime(2019, 1, 1, 0, 0, 0)
 
     def __init__(self, start_date, **kwargs):
         super().__init__(**kwargs)
@@ -231,16 +574,18 @@ class Dispatchers(Model):
         self.script_name = script_name
         self.config_file_name = config_file_name
         self.waiting_period = waiting_period
+        self._unique_columns.append('script_name')
 
         # populate db fields
         if self.script_name:
-            self.config_file_name = self.parse_config_file()
-            self.waiting_period = self.parse_waiting_period()
+            config = configs.load_dispatcher(self.script_name)
+            self.config_file_name = config.config_file_name
+            self.waiting_period = config.waiting_period
         else:
             raise AttributeError("script name cannot be none.")
 
         if self.config_file_name:
-            self.parse_forecastgroup_path()
+            self.forecast_group_paths = list(config.group_paths)
         else:
             raise AttributeError("config filename cannot be none.")
 
@@ -253,221 +598,314 @@ class Dispatchers(Model):
         for group in self.forecast_group_paths:
             yield group
 
-    def parse_config_file(self):
-        p = re.compile(r'--configFile=(\S*)')
-        with open(self.script_name, 'r') as f:
-            lines = f.readlines()
-        para = ''.join(lines).strip()
-        try:
-            # should be regex capture group 1
-            return p.search(para).group(1)
-        except AttributeError:
-            print('Warning: Could not parse config file name from dispatcher script')
-            return None
 
-    def parse_waiting_period(self):
-        p = re.compile(r'waitingPeriod=(\S*)')
-        with open(self.script_name, 'r') as f:
-            lines = f.readlines()
-        para = ''.join(lines).strip()
-        try:
-            # should be regex capture group 1
-            return int(p.search(para).group(1))
-        except AttributeError:
-            print('Warning: Could not parse waiting period from dispatcher script')
-            return None
+class _GroupConfigField:
+    """
+    attribute of a forecast group read from its config on first use and kept by the instance, see
+    configs.GroupConfig. groups without a config get default.
+    """
+    def __init__(self, default=None, convert=None, source=None):
+        """
+        :param default: value, or function returning the value, of groups without a config
+        :param convert: optional, function applied to the value of the config
+        :param source: optional, name of the config field if it differs from the attribute
+        """
+        self.default = default
+        self.convert = convert
+        self.source = source
+        self.name = None
 
-    def parse_forecastgroup_path(self):
-        if self.config_file_name:
-            d = DispatcherInitFile(self.config_file_name)
-            g = d.elements('forecastGroup')
-            for elem in g:
-                self.forecast_group_paths.append(elem.text)
+    def __set_name__(self, owner, name):
+        self.name = name
+        if self.source is None:
+            self.source = name
+
+    def __get__(self, group, owner=None):
+        if group is None:
+            return self
+        config = group.config
+        if config is None:
+            value = self.default() if callable(self.default) else self.default
         else:
-            return None
+            value = getattr(config, self.source)
+            if self.convert is not None:
+                value = self.convert(value)
+        # assigned to the instance, later reads do not reach the descriptor
+        group.__dict__[self.name] = value
+        return value
+
+
+def _parse_entry_date(entry_date_text):
+    if not entry_date_text:
+        return None
+    return datetime.strptime(entry_date_text, '%Y-%m-%d %H:%M:%S')
 
 
 class ForecastGroups(Model):
-    # store the name of the hybrid and bayesian models
-    hybridModel = 'hybridModel'
-    genericModel = 'models'
-    bayesianModel = 'BayesianModel'
-    end_date = Schedule.end_date
+    # last day of the schedule, dates on or after end_date are not expected. None uses the reference time of the
+    # status classifier
+    end_date = None
+    # number of observation days to keep catalog indexes for
+    catalog_index_size = 32
+    forecast_index_size = 4
+    result_index_size = 32
+
+    # parsed from the config file when first used, so building a group does not read anything
+    group_name = _GroupConfigField('')
+    group_description = _GroupConfigField('')
+    config_filepath = _GroupConfigField('')
+    models = _GroupConfigField(list, list)
+    forecast_dir = _GroupConfigField()
+    evaluation_tests = _GroupConfigField(list, list)
+    evaluation_schedule = _GroupConfigField(list, list)
+    forecast_schedule = _GroupConfigField(list, list)
+    result_dir = _GroupConfigField()
+    observation_dir = _GroupConfigField()
+    post_processing = _GroupConfigField()
+    entry_date_text = _GroupConfigField()
+    entry_date = _GroupConfigField(source='entry_date_text', convert=_parse_entry_date)
 
     def __init__(self, group_path, dispatcher_id=None,
-                 config_filepath='', group_name='', group_description='', **kwargs):
+                 config_filepath='', group_name='', group_description='', status_classifier=None, rescan=False,
+                 **kwargs):
         super().__init__(**kwargs)
-        self.entry_date = None
-        self.result_dir = None
-        self.post_processing = None
-        self.fg = None
+        # shared by every forecast, evaluation and catalog of the group
+        self.status_classifier = status_classifier or StatusClassifier()
         self.group_dir = None
-        self.forecast_dir = None
-        self.post_processing = None
-        self.entry_date = None
-        self.observation_dir = None
-        self.models = []
-        self.expected_forecasts = []
+        self._rescan = rescan
+        self._config = None
+        self._expected_forecasts = None
+        self._catalog_indexes = OrderedDict()
+        self._forecast_indexes = OrderedDict()
+        self._result_indexes = OrderedDict()
+        self._schedules = {}
 
         # database fields
         self.group_path = group_path
-        self.group_name = group_name
-        self.group_description = group_description
-        self.config_filepath = config_filepath
         self.dispatcher_id = dispatcher_id
 
         if group_path:
-            self.fg = ForecastGroupInitFile(self.group_path)
-            self.group_description = self.parse_group_description()
-            self.group_name = self.parse_group_name()
-            self.config_filepath = os.path.join(self.group_path, 'forecast.init.xml')
-            self.models = self.parse_models()
-            self.forecast_dir = self.parse_forecast_dir()
-            self.expected_forecasts = self.parse_expected_forecasts()
-            self.evaluation_schedule = self.parse_schedule('evaluationTests')
-            self.forecast_schedule = self.parse_schedule('models')
             self.group_dir = os.path.basename(self.group_path)
-            self.evaluation_tests = self.parse_evaluation_tests()
-            self.result_dir = self.parse_result_dir()
-            self.observation_dir = self.parse_observation_dir()
-            self.post_processing = self.parse_postprocessing()
-            self.entry_date_text = self.parse_entry_date_text()
-            if self.entry_date_text:
-                self.entry_date = datetime.strptime(self.entry_date_text, '%Y-%m-%d %H:%M:%S')
-
-    def parse_entry_date_text(self):
-        """
-        reads the entry date tag from the forecast group init file
-        :return: contents of the entry-date tag
-        """
-        return self.fg.elementValue('entryDate')
-
-    def schedule(self):
-        """
-        generator function to create dates used to expect forecasts and evaluations
-        :return:
-
-        FIXME: modify this routine to generate a schedule based on the schedule in the forecast group config file
-        FIXME: addresses issues #12 and #15
-        """
-        if self.entry_date:
-            s = Schedule(self.entry_date)
-            for date in s.date_range():
-                schedule = Schedules(date, conn=self.conn)
-                yield schedule
         else:
-            return iter([])
+            self.group_name = group_name
+            self.group_description = group_description
+            self.config_filepath = config_filepath
 
-    def forecasts(self):
+    @property
+    def config(self):
         """
-        generator function to return forecasts associated with a particular forecast group
-        :return:
+        config of the group, parsed once per init file and shared by every dispatcher listing the group
+        :return: configs.GroupConfig, None if the group has no path
         """
-        for schedule in self.schedule():
-            for name in self.expected_forecasts:
-                forecast = Forecasts(schedule, self, name, self.forecast_dir, conn=self.conn)
-                yield forecast
+        if self._config is None and self.group_path:
+            self._config = configs.load_group(self.group_path)
+        return self._config
 
-    def evaluations(self):
+    @property
+    def expected_forecasts(self):
         """
-            generator function to produce evaluations associated with a forecast group. note: evaluations made from the
-            forecast group level do not have any association to a particular forecast. if wanting to populate a db model
-            use the generator in class Forecasts(...)
-            :return:
+        forecast names of the group, found in the forecast archive on first use, see parse_expected_forecasts
+        :return: list of forecast names
         """
-        if not self.evaluation_tests:
-            return iter([])
-        for schedule in self.schedule():
-            for test in self.evaluation_tests:
-                for forecast in self.forecasts():
-                    evaluation = Evaluations(schedule, forecast, self.result_dir, test, conn=self.conn)
-                    yield evaluation
+        if self._expected_forecasts is None:
+            self._expected_forecasts = self.parse_expected_forecasts(self._rescan) if self.group_path else []
+        return self._expected_forecasts
 
-    def parse_forecast_dir(self):
+    def compiled_schedule(self, xml_tag='models'):
         """
-        reads location of forecasts stored in forecast group init file
-        :return: full path of directory where forecast archive is located
+        schedule of the forecast group, compiled once from the schedules in the config file
+        :param xml_tag: 'models' for forecasts, 'evaluationTests' for evaluations
+        :return: Schedule object
         """
-        fcdir_path = self.fg.elementValue('forecastDir')
-        if not fcdir_path:
-            return ''
-        if os.path.isabs(fcdir_path):
-            return fcdir_path
-        return os.path.join(self.group_path, fcdir_path)
+        schedule = self._schedules.get(xml_tag)
+        if schedule is None:
+            schedules = self.forecast_schedule if xml_tag == 'models' else self.evaluation_schedule
+            schedule = Schedule(self.entry_date, schedules or (),
+                                end_date=self.end_date or self.status_classifier.now)
+            self._schedules[xml_tag] = schedule
+        return schedule
 
-    def parse_result_dir(self):
+    def is_evaluated(self, date):
         """
-        reads locations of results from forecast group init file
-        :return: full path of directory where evaluations are stored
+        :param date: datetime of a scheduled forecast
+        :return: (bool) True if evaluations are expected on that date
         """
-        resdir_path = self.fg.elementValue('resultDir')
-        if not resdir_path:
-            return ''
-        if os.path.isabs(resdir_path):
-            return resdir_path
-        return os.path.join(self.group_path, resdir_path)
+        return self.compiled_schedule('evaluationTests').has(date)
 
-    def parse_observation_dir(self):
+    def schedule(self, start_date=None, end_date=None, dates=None):
         """
-        reads locations of results from forecast group init file
-        :return: full path of directory where evaluations are stored
+        generator function to create dates used to expect forecasts and evaluations, following the schedule of the
+        models in the forecast group config file
+        :param start_date: optional, first date to include
+        :param end_date: optional, dates on or after end_date are excluded
+        :param dates: optional, collection of date strings YYYY-MM-DD to include
+        :return:
         """
-        obsdir_path = self.fg.elementValue('catalogDir')
-        if not obsdir_path:
-            return ''
-        if os.path.isabs(obsdir_path):
-            return obsdir_path
-        return os.path.join(self.group_path, obsdir_path)
+        if self.entry_date:
+            for date in self.compiled_schedule().dates():
+                if start_date and date < start_date:
+                    continue
+                if end_date and date >= end_date:
+                    break
+                if dates is not None and date.strftime('%Y-%m-%d') not in dates:
+                    continue
+                schedule = Schedules(date, conn=self.conn)
+                yield schedule
+        else:
+            return iter([])
 
-    def parse_postprocessing(self):
+    def forecasts(self, start_date=None, end_date=None, dates=None):
         """
-        reads postprocessing
+        generator function to return forecasts associated with a particular forecast group
+        :param start_date: optional, first date to include
+        :param end_date: optional, dates on or after end_date are excluded
+        :param dates: optional, collection of date strings YYYY-MM-DD to include
         :return:
         """
-        return self.fg.elementValue('postProcessing')
+        for schedule in self.schedule(start_date, end_date, dates):
+            for forecast in self.scheduled_forecasts(schedule):
+                yield forecast
 
-    def parse_group_description(self):
+    def scheduled_forecasts(self, schedule):
         """
-        parses and sets the group name, fails loudly
-        :param group_path: path of the top level folder to the forecast group
+        generator function to return the forecasts of the group for a single scheduled date
+        :param schedule: Schedules object
         :return:
         """
-        # name is stored as attribute on root
-        root = self.fg.root()
-        name = root.attrib['name']
-        return name
+        with profiling.phase('forecasts'):
+            index = self.forecast_index(schedule)
+        forecasts = []
+        for name in self.expected_forecasts:
+            with profiling.phase('forecasts'):
+                forecasts.append(Forecasts(schedule, self, name, self.forecast_dir, index=index, classify=False,
+                                           conn=self.conn))
+        with profiling.phase('forecasts'):
+            self.classify_forecasts(forecasts)
+        for forecast in forecasts:
+            yield forecast
+
+    def classify_forecasts(self, forecasts):
+        """
+        decides the status of forecasts built with classify=False in one pass
+        :param forecasts: list of Forecasts
+        :return: none
+        """
+        statuses = self.status_classifier.classify([forecast.schedule_id.start_date for forecast in forecasts],
+                                                   [forecast.status == 'Complete' for forecast in forecasts],
+                                                   [forecast.waiting_period for forecast in forecasts])
+        for forecast, status in zip(forecasts, statuses):
+            forecast.status = status
 
-    def parse_group_name(self):
+    def classify_evaluations(self, evaluations):
         """
-        parses group name from group path string. name is assumed to be the basename of the path
-        eg.) for group_path /home/csep/operations/SCEC-natural-laboratory/one-day-models-V9.1 the
-        group_name is one-day-models-V9.1
-        :return:
+        decides the status of evaluations built with classify=False in one pass, evaluations happen the day after
+        the forecast
+        :param evaluations: list of Evaluations
+        :return: none
         """
-        name = os.path.basename(self.group_path)
-        return name
+        statuses = self.status_classifier.classify([evaluation.schedule_id.start_date for evaluation in evaluations],
+                                                   [evaluation.status == 'Complete' for evaluation in evaluations],
+                                                   [evaluation.forecast_id.waiting_period
+                                                    for evaluation in evaluations], offset=-1)
+        for evaluation, status in zip(evaluations, statuses):
+            evaluation.status = status
 
-    def parse_models(self):
+    def evaluations(self, start_date=None, end_date=None, dates=None):
         """
-        returns list of models called for each forecast group, handles models defined in
-        models tag of config file, along with the hybrid and bayesian models
-        :return: list of models running in the forecast group or none
+            generator function to produce evaluations associated with a forecast group. note: evaluations made from the
+            forecast group level do not have any association to a particular forecast. if wanting to populate a db model
+            use the generator in class Forecasts(...)
+
+            forecasts are built once per scheduled date and evaluations are yielded date by date, ordered by test and
+            forecast within each date. the statuses of a date are decided in one pass.
+            :param start_date: optional, first date to include
+            :param end_date: optional, dates on or after end_date are excluded
+            :param dates: optional, collection of date strings YYYY-MM-DD to include
+            :return:
         """
-        models = []
-        try:
-            generic_models = self.fg.elementValue(self.genericModel)
-            if generic_models:
-                models.extend(generic_models.split(' '))
-            for elem in self.fg.next(self.bayesianModel):
-                models.append(elem.attrib['name'])
-            for elem in self.fg.next(self.hybridModel):
-                models.append(elem.attrib['name'])
-        except(RuntimeError, KeyError):
-            print("Warning: Could not extract models from ForecastGroup {}."
-                  .format(self.group_path))
-        return models
-
-    def parse_expected_forecasts(self):
+        if not self.evaluation_tests:
+            return iter([])
+        for schedule in self.schedule(start_date, end_date, dates):
+            if not self.is_evaluated(schedule.start_date):
+                continue
+            forecasts = list(self.scheduled_forecasts(schedule))
+            with profiling.phase('evaluations'):
+                index = self.result_index(schedule) if self.result_dir else None
+            evaluations = []
+            for test in self.evaluation_tests:
+                for forecast in forecasts:
+                    with profiling.phase('evaluations'):
+                        evaluations.append(Evaluations(schedule, forecast, self.result_dir, test, index=index,
+                                                       classify=False, conn=self.conn))
+            with profiling.phase('evaluations'):
+                self.classify_evaluations(evaluations)
+            for evaluation in evaluations:
+                yield evaluation
+
+    def result_index(self, schedule):
+        """
+        returns the index of the result directory for a scheduled date. the index is built once per date and
+        shared by every evaluation of the group on that date.
+        :param schedule: Schedules object
+        :return: EvaluationResultIndex object
+        """
+        key = schedule.start_date.strftime("%Y-%m-%d")
+        index = self._result_indexes.get(key)
+        if index is None:
+            index = EvaluationResultIndex(os.path.join(self.result_dir, key))
+            self._result_indexes[key] = index
+            if len(self._result_indexes) > self.result_index_size:
+                self._result_indexes.popitem(last=False)
+        return index
+
+    def catalog_index(self, schedule):
+        """
+        returns the catalog index of the observation directory for a scheduled date. the index is built once per
+        date and shared by every evaluation of the group on that date.
+        :param schedule: Schedules object
+        :return: CatalogIndex object
+        """
+        key = schedule.date_time
+        index = self._catalog_indexes.get(key)
+        if index is None:
+            index = CatalogIndex(os.path.join(self.observation_dir, key))
+            self._catalog_indexes[key] = index
+            if len(self._catalog_indexes) > self.catalog_index_size:
+                self._catalog_indexes.popitem(last=False)
+        return index
+
+    def forecast_index(self, schedule):
+        """
+        returns the index of the monthly forecast archive directory for a scheduled date. the index is built once
+        per month and shared by every forecast of the group in that month.
+        :param schedule: Schedules object
+        :return: ForecastArchiveIndex object
+        """
+        key = schedule.start_date.strftime("%Y_%-m")
+        index = self._forecast_indexes.get(key)
+        if index is None:
+            index = ForecastArchiveIndex(os.path.join(self.forecast_dir, 'archive', key))
+            self._forecast_indexes[key] = index
+            if len(self._forecast_indexes) > self.forecast_index_size:
+                self._forecast_indexes.popitem(last=False)
+        return index
+
+    def prefetch_requests(self, schedule):
+        """
+        directories read while building the forecasts and evaluations of a scheduled date, see artifacts.prefetch
+        :param schedule: Schedules object
+        :return: list of Request
+        """
+        requests = [Request(os.path.join(self.forecast_dir, 'archive', schedule.start_date.strftime("%Y_%-m")))]
+        if self.result_dir and self.evaluation_tests and self.is_evaluated(schedule.start_date):
+            # result files are chosen by creation time
+            requests.append(Request(os.path.join(self.result_dir, schedule.start_date.strftime("%Y-%m-%d")),
+                                    EvaluationResultIndex.result_pattern))
+            if self.observation_dir:
+                requests.append(Request(os.path.join(self.observation_dir, schedule.date_time)))
+        return requests
+
+    def parse_expected_forecasts(self, rescan=False):
         """
         forecasts do not map 1 to 1 to models in CSEP. the expected filename of some forecasts may
         not directly correlate to the list of models and multiple forecasts may be produced by the
@@ -475,28 +913,15 @@ class ForecastGroups(Model):
 
         this algorithm scans the archived forecast directory and extracts the forecast name using
         regular expressions. The list does not use any a priori information from the forecast group configuration
-        file.
+        file. names found in the archive are kept in a persistent catalog, so only new or changed archive
+        directories are listed.
 
+        :param rescan: list the whole archive again instead of trusting the catalog
         :return: expected_forecasts [list] list of expected forecasts
         """
-
-        unique_forecasts = {}
         expected_forecasts = []
-        work_dir = self.forecast_dir
-
-        # scan archive directory for files
-        # if we need performance, this could be cached
-        for root, dirs, names in os.walk(work_dir):
-            regex = re.compile(r'(\S*)_\d+_\d+_\d+\S*')
-            try:
-                forecast_names = [regex.match(name).group(1) for name in names]
-                for forecast_name in forecast_names:
-                    if not forecast_name.startswith('scec.csep'):
-                        unique_forecasts[forecast_name] = None
-            except AttributeError:
-                pass
         # if file has substring of model add to the expected forecasts
-        found_forecasts = list(unique_forecasts.keys())
+        found_forecasts = forecastnames.forecast_names(self.forecast_dir, rescan)
         # first add forecasts sharing the name as model
         # and remove from found files and listed models
         model_straglers = self.models
@@ -512,47 +937,6 @@ class ForecastGroups(Model):
                     expected_forecasts.append(fc)
         return expected_forecasts
 
-    def parse_evaluation_tests(self, xml_elem=None):
-        """
-        either parses entire configuration file, or tests from single element.
-        xml_elem would be used to get schedules for different evaluations
-        :param xml_elem: xml_elem obj to parse tests from
-        :return: returns list of xml elements
-        """
-        # parse all tests
-        if not xml_elem:
-            tests = []
-            try:
-                for elem in self.fg.next('evaluationTests'):
-                    if elem.text:
-                        tests.extend(elem.text.strip().split(' '))
-            except AttributeError:
-                # print warning that no evaluation tests were found.
-                print("Warning: No evaluation tests found for ForecastGroup {}."
-                      .format(self.group_path))
-            return tests
-        # only parse for particular element
-        else:
-            if xml_elem.text:
-                return xml_elem.text.strip().split(' ')
-            else:
-                return []
-
-    def parse_schedule(self, xml_tag):
-        """
-        parses CSEPSchedule from forecast group config file
-        :param xml_tag: string containing the xml tag to parse schedule from; ('models','evaluationTests')
-        :return: CSEPSchedule object
-        """
-        # FIXME: this should generate a list of schedule objects
-        schedule = []
-        try:
-            for elem in self.fg.next(xml_tag):
-                schedule.append(self.fg.schedule(elem))
-        except AttributeError:
-            return []
-        return schedule
-
     @staticmethod
     def as_datetime(date_string):
         """
@@ -563,6 +947,66 @@ class ForecastGroups(Model):
         return text_to_datetime(date_string)
 
 
+class ForecastArchiveIndex:
+    """
+    maps (forecast name, date) -> forecast file for a single monthly archive directory <forecast_dir>/archive/YYYY_M.
+    the directory is listed once, and every forecast of the month is resolved from the index.
+    """
+    date_pattern = re.compile(r'_\d{1,2}_\d{1,2}_\d{4}$')
+
+    def __init__(self, archive_subdir_full):
+        self.archive_subdir_full = archive_subdir_full
+        self.files = frozenset()
+        # forecast stem <model_name>_<month>_<day>_<year> -> (priority, filename)
+        self.forecasts = {}
+
+        try:
+            self.files = dircache.listing(self.archive_subdir_full).files
+        except FileNotFoundError:
+            return
+        extensions = Forecasts.forecast_extensions
+        for filename in self.files:
+            for priority, ext in enumerate(extensions):
+                if not filename.endswith(ext):
+                    continue
+                stem = filename[:-len(ext)]
+                # '-fromXML.xml' also ends with '.xml', the stem has to end with the date
+                if not self.date_pattern.search(stem):
+                    continue
+                found = self.forecasts.get(stem)
+                if found is None or priority > found[0]:
+                    self.forecasts[stem] = (priority, filename)
+
+    @staticmethod
+    def stem(name, date):
+        """
+        :param name: name of the forecast model
+        :param date: datetime of the forecast
+        :return: filename without extension, template -- <model_name>_<month>_<day>_<year>
+        """
+        return name + '_' + date.strftime("%-m_%-d_%Y")
+
+    def resolve(self, name, date):
+        """
+        chooses the forecast file for a model and date. extensions later in Forecasts.forecast_extensions take
+        precedence.
+        :param name: name of the forecast model
+        :param date: datetime of the forecast
+        :return: full path of the forecast file, None if not found
+        """
+        found = self.forecasts.get(self.stem(name, date))
+        if found is None:
+            return None
+        return os.path.join(self.archive_subdir_full, found[1])
+
+    def isfile(self, filepath):
+        """
+        :param filepath: full path of a file in the archive directory
+        :return: (bool) True if the file was listed
+        """
+        return os.path.basename(filepath) in self.files
+
+
 class Forecasts(Model):
 
     # possible extensions for forecast files
@@ -570,7 +1014,7 @@ class Forecasts(Model):
 
     def __init__(self, schedule_id, group_id, name, archive_dir,
                  filepath=None, meta_filepath=None, runtime_testdate=None, waiting_period=None, logfile=None, status=None,
-                 **kwargs):
+                 index=None, classify=True, **kwargs):
         super().__init__(**kwargs)
 
         # database fields
@@ -586,50 +1030,51 @@ class Forecasts(Model):
 
         # unique columns
         self._unique_columns.append('filepath')
+        self._meta_exists = True
 
         # should be passed in from forecast group generator
         self.archive_dir = archive_dir
 
-        # default found extension
-        self._filepaths = self.get_filenames()
-
-        # look for filename on system
-        self.status = 'Missing'
-        found = False
-        while not found and self._filepaths:
-            self.filepath = self._filepaths.pop()
-            if os.path.isfile(self.filepath):
-                self.status = 'Complete'
-                self.meta_filepath = self.filepath + '.meta'
-                found = True
+        # shared by every forecast of the month when created from the forecast group
+        self.index = index
+        if self.index is None:
+            self.index = ForecastArchiveIndex(self.get_archive_subdir())
+
+        # look for filename in the archive, missing forecasts keep the default extension
+        self.filepath = self.index.resolve(self.name, self.schedule_id.start_date)
+        found = bool(self.filepath)
+        if found:
+            self.meta_filepath = self.filepath + '.meta'
+            # meta files are listed with the forecasts, skip opening the ones that do not exist
+            if not self.index.isfile(self.meta_filepath):
+                self._meta_exists = False
+        else:
+            self.filepath = self.get_filenames()[0]
 
-        if self.meta_filepath:
-            self.waiting_period = self.parse_with_regex(r"--waitingPeriod=(\S*)'")
-            self.runtime_testdate = self.parse_with_regex(r"--runtimeTestDate=(\S*)'")
-            self.logfile = self.parse_with_regex(r"--logFile=(\S*)'")
+        if self.meta_filepath and self._meta_exists:
+            meta = self.parse_meta()
+            self.waiting_period = meta.get('waitingPeriod')
+            self.runtime_testdate = meta.get('runtimeTestDate')
+            self.logfile = meta.get('logFile')
 
         # assign forecasts as scheduled if greater than todays date
         if group_id.dispatcher_id and not self.waiting_period:
             self.waiting_period = group_id.dispatcher_id.waiting_period
-        forecast_date = schedule_id.start_date
-        current_date = datetime.today() - timedelta(days=int(self.waiting_period))
-        if self.status == 'Missing' and forecast_date > current_date:
-            self.status = 'Scheduled'
+        if classify:
+            self.status = group_id.status_classifier.status(schedule_id.start_date, found, self.waiting_period)
+        else:
+            # classified with the other forecasts of the date, see ForecastGroups.classify_forecasts
+            self.status = 'Complete' if found else 'Missing'
 
-    def parse_with_regex(self, regex_string):
-        p = re.compile(regex_string)
+    def parse_meta(self):
+        """
+        reads the forecast meta file, see artifacts.metafile.parse_text for the keys
+        :return: dict() of keys found, empty if meta file does not exist
+        """
         try:
-            with open(self.meta_filepath, 'r') as f:
-                lines = f.readlines()
-            para = ''.join(lines).strip()
-            result = p.search(para)
-            # returns result or None
-            if result:
-                return result.group(1)
-            else:
-                return result
+            return metafile.parse(self.meta_filepath)
         except FileNotFoundError:
-            return None
+            return {}
 
     def get_filenames(self):
         """
@@ -638,22 +1083,37 @@ class Forecasts(Model):
         :return: filename if found, None if not found
         """
         filepaths = []
-        archive_subdir = self.schedule_id.start_date.strftime("%Y_%-m")
+        archive_subdir = self.get_archive_subdir()
         for ext in self.forecast_extensions:
-            relative_filepath = self.name + '_' + \
-            self.schedule_id.start_date.strftime("%-m_%-d_%Y") + ext
-            abs_path = os.path.join(self.archive_dir, 'archive', archive_subdir, relative_filepath)
+            relative_filepath = ForecastArchiveIndex.stem(self.name, self.schedule_id.start_date) + ext
+            abs_path = os.path.join(archive_subdir, relative_filepath)
             filepaths.append(abs_path)
         return filepaths
 
+    def get_archive_subdir(self):
+        """
+        monthly archive directory of the forecast
+        template -- <archive_dir>/archive/<year>_<month>
+        :return: full path of archive directory
+        """
+        return os.path.join(self.archive_dir, 'archive', self.schedule_id.start_date.strftime("%Y_%-m"))
+
     def evaluations(self, **kwargs):
         """
         generator function to produce evaluations for a given forecast
         :return: evaluation object or empty iterator if none
         """
-        if self.name and self.group_id.result_dir:
+        if self.name and self.group_id.result_dir and self.group_id.is_evaluated(self.schedule_id.start_date):
+            with profiling.phase('evaluations'):
+                index = self.group_id.result_index(self.schedule_id)
+            evaluations = []
             for test in self.group_id.evaluation_tests:
-                evaluation = Evaluations(self.schedule_id, self, self.group_id.result_dir, test, conn=self.conn)
+                with profiling.phase('evaluations'):
+                    evaluations.append(Evaluations(self.schedule_id, self, self.group_id.result_dir, test,
+                                                   index=index, classify=False, conn=self.conn))
+            with profiling.phase('evaluations'):
+                self.group_id.classify_evaluations(evaluations)
+            for evaluation in evaluations:
                 yield evaluation
         else:
             return iter([])
@@ -661,8 +1121,9 @@ class Forecasts(Model):
 
 class Evaluations(Model):
     def __init__(self, schedule_id, forecast_id, archive_dir, evaluation_name, filepath='', status='',
-                 creation_datetime='', runtime_dir='', full_list_of_files=[],
-                 catalog_result_filepath='', catalog_status='', catalog_creation_datetime='', **kwargs):
+                 creation_datetime='', runtime_dir='', full_list_of_files=(),
+                 catalog_result_filepath='', catalog_status='', catalog_creation_datetime='', index=None, classify=True,
+                 **kwargs):
         super().__init__(**kwargs)
 
         # database fields
@@ -678,7 +1139,7 @@ class Evaluations(Model):
         self.catalog_creation_datetime = catalog_creation_datetime
 
         self.daily_archive_dir = ''
-        self.meta_filepath = []
+        self.meta_filepath = ''
         self.forecast_group_archive_dir = archive_dir
         self.relative_filepath = filepath
 
@@ -698,13 +1159,15 @@ class Evaluations(Model):
                 self.forecast_group_archive_dir,
                 self.date.strftime("%Y-%m-%d")
             )
-            try:
-                self._list_of_result_files = os.listdir(self.daily_archive_dir)
-            except FileNotFoundError:
+            # shared by every evaluation of the day when created from the forecast group
+            if index is None:
+                index = EvaluationResultIndex(self.daily_archive_dir)
+            self._list_of_result_files = index.names
+            if not index.exists:
                 self.status = 'Missing'
 
             if self.name and self.daily_archive_dir:
-                self.filepath = self.determine_full_filepath(self._build_regex())
+                self.filepath = index.resolve(self.name, self.forecast_name, self.date)
 
         # even though creation_datetime exists in meta file we can use system cdate as a
         # fallback
@@ -716,55 +1179,37 @@ class Evaluations(Model):
         if self.meta_filepath:
             self.runtime_dir = self.parse_runtime_dir()
 
-        # set status of evaluation
-        if self.filepath:
-            self.status = "Complete"
-        else:
-            self.status = "Missing"
-
         # get catalog information
         catalog = self.get_catalog()
         self.catalog_result_filepath = catalog.result_filepath
         self.catalog_status = catalog.status
         self.catalog_creation_datetime = catalog.creation_datetime
 
-        # assign forecasts as scheduled if greater than today's date
+        # set status of evaluation, missing evaluations are scheduled if greater than today's date
         # evaluations happen the day after the forecast
-        if self.forecast_id.waiting_period:
-            waiting_period = self.forecast_id.waiting_period
         # FIXME: hard-coded for one-day models, don't ignore
-        evaluation_date = self.schedule_id.start_date
-        current_date = datetime.today() - timedelta(days=int(waiting_period)-1)
-        if self.status == 'Missing' and evaluation_date > current_date:
-            self.status = 'Scheduled'
+        if classify:
+            classifier = self.forecast_id.group_id.status_classifier
+            self.status = classifier.status(self.schedule_id.start_date, bool(self.filepath),
+                                            self.forecast_id.waiting_period, offset=-1)
+        else:
+            # classified with the other evaluations of the date, see ForecastGroups.classify_evaluations
+            self.status = 'Complete' if self.filepath else 'Missing'
 
     def parse_runtime_dir(self):
-        p = re.compile(r"runtimeDirectory=(\S*)'")
         try:
-            with open(self.meta_filepath, 'r') as f:
-                lines = f.readlines()
-            para = ''.join(lines).strip()
-            result = p.search(para)
-            if result:
-                return result.group(1)
-            else:
-                return ''
+            return metafile.parse(self.meta_filepath).get('runtimeDirectory', '')
         except FileNotFoundError:
             return ''
 
     def parse_creation_datetime(self):
-        p = re.compile(r"CreationDateTime = (\S*)")
         try:
-            with open(self.meta_filepath, 'r') as f:
-                lines = f.readlines()
-            para = ''.join(lines).strip()
-            result = p.search(para)
-            if result:
-                datetime_string = result.group(1)
+            datetime_string = metafile.parse(self.meta_filepath).get('CreationDateTime')
+            if datetime_string is not None:
                 dt = datetime.strptime(datetime_string, '%Y-%m-%dT%H:%M:%S')
                 return dt.strftime('%Y-%m-%d')
         except FileNotFoundError:
-            ctime = os.path.getctime(self.filepath)
+            ctime = dircache.getctime(self.filepath)
             ctime_human = datetime.fromtimestamp(ctime).strftime('%Y-%m-%d')
             return ctime_human
         return ''
@@ -797,7 +1242,7 @@ class Evaluations(Model):
         full = list(map(lambda x: os.path.join(self.daily_archive_dir, x), matches))
         full_newest = ''
         if full:
-            full_newest = max(full, key=os.path.getctime)
+            full_newest = max(full, key=dircache.getctime)
         return full_newest
 
     def determine_meta_filepath(self):
@@ -806,7 +1251,7 @@ class Evaluations(Model):
         :return: list of found forecast files, empty list if none
         """
         meta = self.filepath + '.meta'
-        if os.path.isfile(meta):
+        if dircache.isfile(meta):
             return meta
         else:
             return ''
@@ -856,22 +1301,11 @@ class Evaluations(Model):
             rowid = int(result[0])
             status_from_db = str(result[1])
             if result:
-                # if new evaluation found, we want to update everything
-                if self.status == "Complete":
-                    cursor.execute('update Evaluations set filepath=?, status=?, runtime_dir=?, creation_datetime=?,' +
-                                   ' catalog_result_filepath=?, catalog_status=?, catalog_creation_datetime=?' +
-                                   ' where rowid=?', (self.filepath, self.status, self.runtime_dir, self.creation_datetime,
-                                                      self.catalog_result_filepath, self.catalog_status,
-                                                      self.catalog_creation_datetime, rowid))
-
-                # if we have found a catalog, but not an evaluation only update the catalog
-                # note: if there is an evaluation in the database, we don't want to overwrite it
-                elif self.catalog_status == "Present" and status_from_db == 'Missing':
-                    print(self.catalog_result_filepath)
-                    cursor.execute('update Evaluations set catalog_result_filepath=?, catalog_status=?, ' +
-                                   'catalog_creation_datetime=? where rowid=?',
-                                   (self.catalog_result_filepath, self.catalog_status, self.catalog_creation_datetime,
-                                    rowid))
+                update = self._conflict_update(vars(self), status_from_db)
+                if update:
+                    cursor.execute('update Evaluations set {} where rowid=?'
+                                   .format(', '.join('{}=?'.format(f) for f in update)),
+                                   tuple(update.values()) + (rowid,))
 
                 # update insert id for fk purposes
                 self._insert_id = cursor.lastrowid
@@ -879,18 +1313,157 @@ class Evaluations(Model):
 
         return True
 
+    @staticmethod
+    def _conflict_update(values, status_from_db):
+        """
+        determines which columns to update when the evaluation already exists in the database
+        :param values: mapping of field -> value for the new evaluation
+        :param status_from_db: status of the evaluation stored in the database
+        :return: OrderedDict mapping field -> value, empty if nothing should be updated
+        """
+        update = OrderedDict()
+        # if new evaluation found, we want to update everything
+        if values['status'] == "Complete":
+            for field in ('filepath', 'status', 'runtime_dir', 'creation_datetime', 'catalog_result_filepath',
+                          'catalog_status', 'catalog_creation_datetime'):
+                update[field] = values[field]
+
+        # if we have found a catalog, but not an evaluation only update the catalog
+        # note: if there is an evaluation in the database, we don't want to overwrite it
+        elif values['catalog_status'] == "Present" and status_from_db == 'Missing':
+            for field in ('catalog_result_filepath', 'catalog_status', 'catalog_creation_datetime'):
+                update[field] = values[field]
+        return update
+
+    def _bulk_insert(self, writer, values):
+        return self.bulk_insert_values(writer, values)
+
+    @classmethod
+    def bulk_insert_values(cls, writer, values):
+        """
+        buffers evaluation row in a BulkInserter, resolving conflicts on (forecast_id, name) in memory the same way
+        as insert()
+        :param writer: BulkInserter instance
+        :param values: dict mapping field -> value with foreign keys resolved
+        :return: rowid of the evaluation
+        """
+        table = cls.__name__
+        key_columns = ('forecast_id', 'name')
+        track = ('status',)
+        row = writer.find(table, key_columns, (values['forecast_id'], values['name']), track=track)
+        if row is None:
+            row = writer.add(table, values, key_columns=key_columns, track=track)
+        else:
+            update = cls._conflict_update(values, row['status'])
+            if update:
+                writer.update(table, update, row['rowid'])
+                row['status'] = update.get('status', row['status'])
+        return row['rowid']
+
     def get_catalog(self):
-        catalog = Catalogs(self.schedule_id, self)
+        with profiling.phase('catalogs'):
+            index = self.forecast_id.group_id.catalog_index(self.schedule_id)
+            catalog = Catalogs(self.schedule_id, self, index=index)
         return catalog
 
 
+class EvaluationResultIndex:
+    """
+    maps (test name, forecast name, date) -> newest evaluation result for a single daily result directory. the
+    directory is scanned once with a single pattern, and every evaluation of the day is resolved from the index.
+    """
+    # <prefix><test>-Test_<forecast>_<month>_<day>_<year><suffix>.xml
+    result_pattern = re.compile(r"^(?P<head>\S*?)-Test_(?P<forecast>\S+?)_(?P<date>[1-9]\d?_[1-9]\d?_\d{4})\S*.xml")
+
+    def __init__(self, daily_archive_dir):
+        self.daily_archive_dir = daily_archive_dir
+        self.exists = True
+        self.names = []
+        # (forecast name, <month>_<day>_<year>) -> list of (head, filename, ctime) in listing order
+        self.results = {}
+
+        try:
+            listing = dircache.listing(self.daily_archive_dir)
+        except FileNotFoundError:
+            self.exists = False
+            return
+        self.names = list(listing.names)
+        for name in listing.names:
+            if name.endswith('.meta'):
+                continue
+            match = self.result_pattern.match(name)
+            if not match:
+                continue
+            try:
+                ctime = listing.entries[name].ctime
+            except FileNotFoundError:
+                continue
+            self.results.setdefault((match.group('forecast'), match.group('date')), []) \
+                .append((match.group('head'), name, ctime))
+
+    def resolve(self, test, forecast, date):
+        """
+        chooses the newest result file of an evaluation, by creation time. test names match on the end of the
+        prefix, so a test 'L' also matches results of 'CL'.
+        :param test: name of the evaluation test
+        :param forecast: name of the forecast model
+        :param date: datetime of the evaluation
+        :return: full path of the result file, empty string if not found
+        """
+        newest = None
+        for head, name, ctime in self.results.get((forecast, date.strftime("%-m_%-d_%Y")), ()):
+            if head.endswith(test) and (newest is None or ctime > newest[1]):
+                newest = (name, ctime)
+        if newest is None:
+            return ''
+        return os.path.join(self.daily_archive_dir, newest[0])
+
+
+class CatalogIndex:
+    """
+    maps creation date -> catalog meta file for a single observation directory. the answer only depends on the
+    directory contents, so one index serves every evaluation scheduled on that date.
+    """
+    catalog_type = 'catalog.nodecl.dat'
+
+    def __init__(self, obs_dir_full):
+        self.obs_dir_full = obs_dir_full
+        self.meta_file_map = {}
+        self.dates = []
+
+        for mfile in dircache.glob(self.obs_dir_full, "*.meta"):
+            metadata_dict = Catalogs.parse_data_from_metafiles(mfile)
+            if metadata_dict['type'] == self.catalog_type:
+                self.meta_file_map[metadata_dict['creation_date']] = mfile
+                self.dates.append(metadata_dict['creation_date'])
+        self.dates.sort()
+
+    def resolve(self, creation_datetime):
+        """
+        chooses the catalog matching the creation date of an evaluation
+        :param creation_datetime: creation date of the evaluation, could be ''
+        :return: creation_datetime, result_filepath of the catalog. empty strings if no catalog found
+        """
+        if not self.dates:
+            return '', ''
+        # eval.creation_date could be '' or some date string
+        # if '' or date string not found in directory we get key error in dict
+        try:
+            meta_file = self.meta_file_map[creation_datetime]
+        # if does not exist, choose most recent
+        except KeyError:
+            creation_datetime = self.dates[0]
+            meta_file = self.meta_file_map[creation_datetime]
+        return creation_datetime, meta_file[:-5]
+
+
 class Catalogs:
     """
     associates the catalog used for a particular evaluation, or the catalog that would be used in the
     case the evaluation does not exist.
     """
     def __init__(self, schedule_id, evaluation_id, filepath='', status='',
-                 creation_datetime=''):
+                 creation_datetime='', index=None):
 
         # db fields
         self.schedule_id = schedule_id
@@ -906,6 +1479,11 @@ class Catalogs:
         # observation date directory
         self.obs_dir_full = os.path.join(self.obs_dir, self.schedule_id.date_time)
 
+        # catalog index can be shared between evaluations on the same date
+        self.index = index
+        if self.index is None:
+            self.index = CatalogIndex(self.obs_dir_full)
+
         # parse information from catalogs dir
         self.creation_datetime, self.result_filepath = self.parse_result_filepath_and_creation_date()
         self.status = self.parse_status()
@@ -917,52 +1495,16 @@ class Catalogs:
         meta datafile -> verify catalog type -> assign file name
         :return:
         """
-        # in observation directory
-        obs_dir = self.obs_dir_full
-        meta_file_map = {}
-        dates = []
-        creation_datetime = ''
-        result_filepath = ''
-
-        meta_files = glob.glob(os.path.join(obs_dir, "*.meta"))
-        if meta_files:
-            for mfile in meta_files:
-                metadata_dict = self.parse_data_from_metafiles(mfile)
-                if metadata_dict['type'] == 'catalog.nodecl.dat':
-                    meta_file_map[metadata_dict['creation_date']] = mfile
-                    dates.append(metadata_dict['creation_date'])
-
-            # eval.creation_date could be '' or some date string
-            # if '' or date string not found in directory we get key error in dict
-            try:
-                meta_file = meta_file_map[self.evaluation_id.creation_datetime]
-                creation_datetime = self.evaluation_id.creation_datetime
-            # if does not exist, choose most recent
-            except KeyError:
-                creation_datetime = sorted(dates)[0]
-                meta_file = meta_file_map[creation_datetime]
-
-            result_filepath = meta_file[:-5]
-
-        return creation_datetime, result_filepath
+        return self.index.resolve(self.evaluation_id.creation_datetime)
 
     def parse_status(self):
         """
         :return: (bool)
         """
-
-        if not os.path.isfile(self.result_filepath):
-            status = 'Missing'
-
-        else:
-            status = "Present"
-
-        waiting_period = self.evaluation_id.forecast_id.waiting_period
-        current_date = datetime.today() - timedelta(days=int(waiting_period)-1)
-        if status == "Missing" and self.schedule_id.start_date > current_date:
-            status = "Scheduled"
-
-        return status
+        forecast = self.evaluation_id.forecast_id
+        classifier = forecast.group_id.status_classifier
+        return classifier.status(self.schedule_id.start_date, dircache.isfile(self.result_filepath),
+                                 forecast.waiting_period, offset=-1, present='Present')
 
     @staticmethod
     def parse_data_from_metafiles(fname):
@@ -974,16 +1516,12 @@ class Catalogs:
                 [creation_date]
         """
         metadata = {}
-        with open(fname) as f:
-            lines = f.readlines()
+        meta = metafile.parse(fname)
         # filetype is first line of the file
-        metadata['type'] = lines[0][1:].strip()
+        metadata['type'] = meta['type']
 
-        p = re.compile(r"CreationDateTime = (\S*)")
-        para = ''.join(lines).strip()
-        result = p.search(para)
-        if result:
-            datetime_string = result.group(1)
+        datetime_string = meta.get('CreationDateTime')
+        if datetime_string is not None:
             dt = datetime.strptime(datetime_string, '%Y-%m-%dT%H:%M:%S')
             metadata['creation_date'] = dt.strftime('%Y-%m-%d')
         else:
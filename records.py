@@ -0,0 +1,75 @@
+from collections import OrderedDict
+
+"""
+lightweight records of scanned forecast groups, forecasts and evaluations. records only hold the values stored in
+the database and no references to other objects, so a scan can be kept in memory, streamed or sent between
+processes without holding on to Model instances and their directory listings.
+"""
+
+
+class Record:
+    """
+    base class for records. subclasses list their database fields in fields, foreign keys are not part of a record.
+    """
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        copies the database fields of a Model
+        :param model: Model instance
+        :return: record
+        """
+        return cls(**dict((field, getattr(model, field)) for field in cls.fields))
+
+    def values(self):
+        """
+        :return: OrderedDict mapping field -> value, in the order of the table
+        """
+        return OrderedDict((field, getattr(self, field)) for field in self.fields)
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__,
+                               ', '.join('{}={!r}'.format(field, getattr(self, field)) for field in self.__slots__))
+
+
+class GroupRecord(Record):
+    fields = ('group_name', 'group_path', 'group_description', 'config_filepath')
+    __slots__ = fields
+
+
+class EvaluationRecord(Record):
+    fields = ('filepath', 'name', 'status', 'runtime_dir', 'creation_datetime',
+              'catalog_result_filepath', 'catalog_status', 'catalog_creation_datetime')
+    __slots__ = fields
+
+
+class ForecastRecord(Record):
+    """
+    forecast scanned for a scheduled day, along with the records of its evaluations
+    """
+    fields = ('name', 'filepath', 'meta_filepath', 'waiting_period', 'logfile', 'status')
+    __slots__ = ('date_time', 'evaluations') + fields
+
+    @classmethod
+    def from_model(cls, model, evaluations=()):
+        """
+        copies the database fields of a Forecasts model
+        :param model: Forecasts instance
+        :param evaluations: list of EvaluationRecord
+        :return: ForecastRecord
+        """
+        record = super().from_model(model)
+        record.date_time = model.schedule_id.date_time
+        record.evaluations = list(evaluations)
+        return record
@@ -0,0 +1,96 @@
+"""
+read api for the status summary tables. ForecastStatusCounts and EvaluationStatusCounts hold the number of rows per
+forecast group, model, month and status. they are kept up to date by triggers on Forecasts and Evaluations, see
+db_schema.sql, so reports read a few hundred rows instead of aggregating the fact tables.
+"""
+
+
+def forecast_counts(conn, status='Missing', group_name=None):
+    """
+    number of forecasts with status for every forecast model
+    :param conn: sqlite3 connection
+    :param status: status to count
+    :param group_name: optional, only count forecasts of this forecast group
+    :return: list of (forecast name, count) ordered by name, models without forecasts in status have a count of 0
+    """
+    query = ("select ForecastStatusCounts.name, sum(case when status=? then count else 0 end) "
+             "from ForecastStatusCounts join ForecastGroups on forecastgroup_id=group_id "
+             "where count > 0 {} group by ForecastStatusCounts.name order by ForecastStatusCounts.name")
+    return _fetch(conn, query, status, group_name)
+
+
+def evaluation_counts(conn, status='Missing', group_name=None):
+    """
+    number of evaluations with status for every forecast model and evaluation test
+    :param conn: sqlite3 connection
+    :param status: status to count
+    :param group_name: optional, only count evaluations of this forecast group
+    :return: list of (forecast name, test name, count) ordered by forecast and test
+    """
+    query = ("select forecast_name, name, sum(case when status=? then count else 0 end) "
+             "from EvaluationStatusCounts join ForecastGroups on forecastgroup_id=group_id "
+             "where count > 0 {} group by forecast_name, name order by forecast_name, name")
+    return _fetch(conn, query, status, group_name)
+
+
+def group_completion(conn):
+    """
+    completed and expected forecasts and evaluations for every forecast group and month. scheduled rows are not
+    expected yet and are left out.
+    :param conn: sqlite3 connection
+    :return: list of (group name, month YYYY-MM, forecasts complete, forecasts expected, evaluations complete,
+             evaluations expected) ordered by group and month
+    """
+    query = ("select group_name, month, sum(forecasts_complete), sum(forecasts_expected), "
+             "sum(evaluations_complete), sum(evaluations_expected) from ("
+             "select group_id, month, "
+             "case when status='Complete' then count else 0 end as forecasts_complete, "
+             "case when status!='Scheduled' then count else 0 end as forecasts_expected, "
+             "0 as evaluations_complete, 0 as evaluations_expected from ForecastStatusCounts "
+             "union all select group_id, month, 0, 0, "
+             "case when status='Complete' then count else 0 end, "
+             "case when status!='Scheduled' then count else 0 end from EvaluationStatusCounts) "
+             "join ForecastGroups on forecastgroup_id=group_id "
+             "group by group_name, month order by group_name, month")
+    return conn.execute(query).fetchall()
+
+
+def rebuild(conn):
+    """
+    recomputes the summary tables from Forecasts and Evaluations. needed for databases extracted before the
+    summary tables existed.
+    :param conn: sqlite3 connection
+    :return: none
+    """
+    cursor = conn.cursor()
+    cursor.execute("delete from ForecastStatusCounts")
+    cursor.execute("delete from EvaluationStatusCounts")
+    cursor.execute("insert into ForecastStatusCounts (group_id, name, month, status, count) "
+                   "select keys.group_id, keys.name, month, ifnull(status, ''), count(*) "
+                   "from ForecastCountKeys as keys join Forecasts using (forecast_id) "
+                   "group by keys.group_id, keys.name, month, ifnull(status, '')")
+    cursor.execute("insert into EvaluationStatusCounts (group_id, forecast_name, name, month, status, count) "
+                   "select group_id, forecast_name, keys.name, month, ifnull(status, ''), count(*) "
+                   "from EvaluationCountKeys as keys join Evaluations using (evaluation_id) "
+                   "group by group_id, forecast_name, keys.name, month, ifnull(status, '')")
+    conn.commit()
+
+
+def is_stale(conn):
+    """
+    :param conn: sqlite3 connection
+    :return: (bool) True if forecasts exist but the summary tables are empty
+    """
+    cursor = conn.cursor()
+    summarized = cursor.execute("select exists (select 1 from ForecastStatusCounts)").fetchone()[0]
+    forecasts = cursor.execute("select exists (select 1 from Forecasts)").fetchone()[0]
+    return bool(forecasts and not summarized)
+
+
+def _fetch(conn, query, status, group_name):
+    params = [status]
+    condition = ''
+    if group_name is not None:
+        condition = 'and group_name=?'
+        params.append(group_name)
+    return conn.execute(query.format(condition), params).fetchall()
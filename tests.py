@@ -1,7 +1,31 @@
 import unittest
+from unittest import mock
 import os
 import sqlite3
-from models import Model
+import tempfile
+import shutil
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from models import Model, Dispatchers, ForecastGroups, Forecasts, Evaluations, Schedule, StatusClassifier, CatalogIndex, ForecastArchiveIndex, EvaluationResultIndex, BulkInserter
+from artifacts.dircache import DirectoryCache
+from artifacts.metafile import MetaFileCache, parse_text
+from artifacts.forecastnames import ForecastNameCatalog
+from artifacts.snapshot import Crawler, Snapshot, manifest_schema
+from artifacts import fs
+from artifacts.profiling import Profiler
+from artifacts.prefetch import Prefetcher, Request
+from artifacts import dircache, forecastnames, profiling
+import configs
+from artifacts.synthetic import Generator, Parameters
+from artifacts.create import create_schema, create_indexes, drop_indexes, index_names
+from artifacts import load
+from artifacts.session import connect, Session
+from extraction import ScanState, Writer, extract
+from records import ForecastRecord, EvaluationRecord
+import summaries
+from configs import ConfigCache, parse_dispatcher
 
 """
 Testing model base class to ensure db functionality working properly.
@@ -333,6 +357,22 @@ class TestDatabaseAccess(unittest.TestCase):
         fields = ['dispatcher_id', 'group_id']
         self.assertListEqual(dfg.fields, fields)
 
+    def test_fields_loaded_once_per_table(self):
+        """
+        fields should be read from the database once and shared by every instance of the model
+        """
+        db = sqlite3.connect('test_db')
+        statements = []
+        db.set_trace_callback(statements.append)
+
+        class Catalogs(Model):
+            pass
+
+        for _ in range(3):
+            c = Catalogs(conn=db)
+        self.assertListEqual(c.fields, ['data_filename', 'creation_date', 'post_processing'])
+        self.assertEqual(len(statements), 1)
+
     def test_get_table_name(self):
         """
         checks whether class name is properly stored in self.table. does not require database
@@ -485,5 +525,1072 @@ class TestGenerateInsertValues(unittest.TestCase):
         self.assertDictEqual(test_dict, c._insert_values)
 
 
+class TestBulkInsert(unittest.TestCase):
+    """
+    bulk inserts should write the same rows as Model.insert() with unique keys and foreign keys
+    resolved in memory.
+    """
+    def setUp(self):
+        """
+        create test database for bulk inserts
+        :return:
+        """
+        conn = sqlite3.connect('test_db')
+        cursor = conn.cursor()
+
+        tables = ["""CREATE TABLE IF NOT EXISTS Catalogs (
+                     catalog_id INTEGER PRIMARY KEY,
+                     data_filename TEXT NOT NULL,
+                     creation_date TEXT NOT NULL,
+                     post_processing TEXT NOT NULL
+                     );""",
+                  """CREATE TABLE IF NOT EXISTS Forecasts (
+                     forecast_id INTEGER PRIMARY KEY,
+                     name TEXT,
+                     catalog_id INTEGER,
+                     FOREIGN KEY(catalog_id) REFERENCES Catalogs
+                     );"""]
+
+        for create_table in tables:
+            cursor.execute(create_table)
+
+        conn.commit()
+
+    def tearDown(self):
+        os.remove('test_db')
+
+    def test_bulk_insert_with_unique_id(self):
+        """ rows sharing a unique key should be inserted once, including keys already in the database """
+        db = sqlite3.connect('test_db')
+        cursor = db.cursor()
+
+        class Forecasts(Model):
+            def __init__(self, catalog_id=None, **kwargs):
+                super().__init__(**kwargs)
+                self.name = 'test_forecast'
+                self.catalog_id = catalog_id
+
+        class Catalogs(Model):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.data_filename = 'test_catalog_filename'
+                self.creation_date = '5-23-2018 12:00:00'
+                self.post_processing = 'unknown'
+
+                self._unique_columns.append('creation_date')
+
+        # existing row should be found without querying per insert
+        Catalogs(conn=db).insert()
+        db.commit()
+
+        writer = BulkInserter(db, batch_size=1)
+        for _ in range(3):
+            writer.insert(Forecasts(catalog_id=Catalogs(conn=db), conn=db))
+        writer.flush()
+        db.commit()
+
+        cursor.execute('select count(rowid) from Catalogs;')
+        self.assertEqual(cursor.fetchone()[0], 1)
+
+        cursor.execute('select * from Forecasts join Catalogs on Forecasts.catalog_id=Catalogs.catalog_id')
+        test_result = [(i, 'test_forecast', 1, 1, 'test_catalog_filename', '5-23-2018 12:00:00', 'unknown')
+                       for i in range(1, 4)]
+        self.assertListEqual(cursor.fetchall(), test_result)
+
+    def test_bulk_insert_buffers_until_flush(self):
+        """ rows should only be written once the writer is flushed """
+        db = sqlite3.connect('test_db')
+        cursor = db.cursor()
+
+        class Catalogs(Model):
+            data_filename = 'test_filename'
+            creation_date = '5-23-2018 12:00:00'
+            post_processing = 'unknown'
+
+        writer = BulkInserter(db)
+        c = Catalogs(conn=db)
+        self.assertEqual(writer.insert(c), 1)
+        self.assertEqual(c.insert_id, 1)
+
+        cursor.execute('select count(rowid) from Catalogs;')
+        self.assertEqual(cursor.fetchone()[0], 0)
+
+        writer.flush()
+        cursor.execute('select * from Catalogs')
+        self.assertListEqual(cursor.fetchall(), [(1, 'test_filename', '5-23-2018 12:00:00', 'unknown')])
+
+    def test_bulk_insert_loads_keys_of_scope(self):
+        """ only keys of existing rows in the looked up scope should be loaded from the database """
+        db = sqlite3.connect('test_db')
+        cursor = db.cursor()
+        cursor.executemany('insert into Forecasts (name, catalog_id) values (?, ?)',
+                           [('forecast_{}'.format(i), i % 3) for i in range(10)])
+        db.commit()
+
+        writer = BulkInserter(db)
+        writer.lookup_size = 2
+        writer.load_keys('Forecasts', ('catalog_id', 'name'), [0, 2])
+        keys, loaded = writer._keys[('Forecasts', ('catalog_id', 'name'))]
+        self.assertSetEqual(loaded, {'0', '2'})
+        self.assertEqual(len(keys), 7)
+
+        # the first key column of a lookup outside the scope is loaded on demand
+        self.assertDictEqual(writer.find('Forecasts', ('catalog_id', 'name'), (1, 'forecast_4')), {'rowid': 5})
+        self.assertSetEqual(loaded, {'0', '1', '2'})
+        self.assertIsNone(writer.find('Forecasts', ('catalog_id', 'name'), (1, 'forecast_0')))
+
+        # existing rows are not inserted again
+        values = OrderedDict([('name', 'forecast_3'), ('catalog_id', 0)])
+        self.assertEqual(writer.add('Forecasts', values, ('catalog_id', 'name'))['rowid'], 4)
+        writer.flush()
+        cursor.execute('select count(rowid) from Forecasts;')
+        self.assertEqual(cursor.fetchone()[0], 10)
+
+
+class TestRecords(unittest.TestCase):
+    """
+    records should copy the database fields of models without keeping references to them.
+    """
+    def test_forecast_record_from_model(self):
+        class Schedules:
+            date_time = '2018-02-07'
+
+        class Forecasts:
+            schedule_id = Schedules()
+            name = 'ETAS'
+            filepath = 'ETAS_2_7_2018.xml'
+            meta_filepath = 'ETAS_2_7_2018.xml.meta'
+            waiting_period = '31'
+            logfile = None
+            status = 'Complete'
+
+        evaluation = EvaluationRecord(name='N', status='Missing')
+        record = ForecastRecord.from_model(Forecasts(), [evaluation])
+
+        self.assertEqual(record.date_time, '2018-02-07')
+        self.assertListEqual(list(record.values().items()),
+                             [('name', 'ETAS'), ('filepath', 'ETAS_2_7_2018.xml'),
+                              ('meta_filepath', 'ETAS_2_7_2018.xml.meta'), ('waiting_period', '31'),
+                              ('logfile', None), ('status', 'Complete')])
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+
+class TestScanState(unittest.TestCase):
+    """
+    incremental extraction should rescan new days, changed days and days with pending status.
+    """
+    def setUp(self):
+        self.db = create_schema('db_schema.sql', 'test_db')
+
+    def tearDown(self):
+        self.db.close()
+        os.remove('test_db')
+
+    def test_changed_dates(self):
+        state = ScanState(self.db)
+        recorded = {'2018-02-07': (1, 1, 1), '2018-02-08': (1, 2, None)}
+        state.record('group', recorded, '2018-02-08')
+
+        current = {'2018-02-07': (1, 1, 1), '2018-02-08': (1, 3, None), '2018-02-09': (1, None, None)}
+        self.assertSetEqual(state.changed_dates('group', current), {'2018-02-08', '2018-02-09'})
+        self.assertSetEqual(state.changed_dates('new_group', current), set(current))
+
+    def test_pending_dates(self):
+        cursor = self.db.cursor()
+        cursor.executemany('insert into Schedules (date_time) values (?)',
+                           [('2018-02-07',), ('2018-02-08',), ('2018-02-09',)])
+        cursor.executemany('insert into Forecasts (schedule_id, group_id, name, filepath, waiting_period, status) '
+                           'values (?, 1, ?, ?, 31, ?)',
+                           [(1, 'ETAS', 'f1', 'Missing'), (2, 'ETAS', 'f2', 'Missing'), (3, 'ETAS', 'f3', 'Scheduled')])
+
+        state = ScanState(self.db)
+        # missing forecasts are only pending within the waiting period
+        self.assertSetEqual(state.pending_dates('2018-03-10'), {'2018-02-08', '2018-02-09'})
+
+        state.delete_rows(['2018-02-08'])
+        cursor.execute('select filepath from Forecasts')
+        self.assertListEqual(cursor.fetchall(), [('f1',), ('f3',)])
+
+
+class TestDirectoryCache(unittest.TestCase):
+    """
+    directory listings should be read once and re-read only when the directory changes.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name in ['a.dat', 'a.dat.meta', 'b.dat']:
+            open(os.path.join(self.dir, name), 'w').close()
+        os.mkdir(os.path.join(self.dir, 'subdir'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_listing_is_cached(self):
+        cache = DirectoryCache(ttl=0)
+        first = cache.listing(self.dir)
+        second = cache.listing(self.dir)
+        self.assertIs(first, second)
+        self.assertEqual(cache.misses, 1)
+        self.assertSetEqual(set(first.names), {'a.dat', 'a.dat.meta', 'b.dat', 'subdir'})
+        self.assertSetEqual(set(first.files), {'a.dat', 'a.dat.meta', 'b.dat'})
+
+    def test_listing_invalidated_by_mtime(self):
+        cache = DirectoryCache(ttl=0)
+        cache.listing(self.dir)
+        open(os.path.join(self.dir, 'c.dat'), 'w').close()
+        # force a different mtime in case the filesystem has coarse timestamps
+        os.utime(self.dir, ns=(0, 0))
+        self.assertIn('c.dat', cache.listing(self.dir).names)
+        self.assertEqual(cache.misses, 2)
+
+    def test_missing_directory(self):
+        cache = DirectoryCache(ttl=0)
+        missing = os.path.join(self.dir, 'missing')
+        with self.assertRaises(FileNotFoundError):
+            cache.listing(missing)
+        os.mkdir(missing)
+        self.assertTupleEqual(cache.listing(missing).names, ())
+
+    def test_entries_stat_once(self):
+        cache = DirectoryCache(ttl=0)
+        entries = cache.listing(self.dir).entries
+        self.assertTrue(entries['a.dat'].is_file)
+        self.assertFalse(entries['subdir'].is_file)
+        ctime = entries['a.dat'].ctime
+        os.remove(os.path.join(self.dir, 'a.dat'))
+        # answered from the stat result read before the file was removed
+        self.assertEqual(entries['a.dat'].ctime, ctime)
+        self.assertEqual(entries['a.dat'].size, 0)
+        os.remove(os.path.join(self.dir, 'b.dat'))
+        with self.assertRaises(FileNotFoundError):
+            entries['b.dat'].ctime
+
+    def test_lru_eviction(self):
+        cache = DirectoryCache(maxsize=1, ttl=0)
+        cache.listing(self.dir)
+        cache.listing(os.path.join(self.dir, 'subdir'))
+        cache.listing(self.dir)
+        self.assertEqual(cache.misses, 3)
+
+
+class TestCatalogIndex(unittest.TestCase):
+    """
+    catalog index should map creation dates to catalog files in an observation directory.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        catalogs = [('catalog.nodecl.dat', 'catalog.nodecl.dat', '2018-02-08T01:00:00'),
+                    ('catalog2.nodecl.dat', 'catalog.nodecl.dat', '2018-02-07T01:00:00'),
+                    ('catalog.dat', 'catalog.dat', '2018-02-01T01:00:00')]
+        for name, filetype, creation in catalogs:
+            with open(os.path.join(self.dir, name + '.meta'), 'w') as f:
+                f.write('# {}\nCreationDateTime = {}\n'.format(filetype, creation))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_resolve_matching_creation_date(self):
+        index = CatalogIndex(self.dir)
+        self.assertTupleEqual(index.resolve('2018-02-08'),
+                              ('2018-02-08', os.path.join(self.dir, 'catalog.nodecl.dat')))
+
+    def test_resolve_unknown_creation_date(self):
+        index = CatalogIndex(self.dir)
+        self.assertTupleEqual(index.resolve(''),
+                              ('2018-02-07', os.path.join(self.dir, 'catalog2.nodecl.dat')))
+
+    def test_resolve_missing_directory(self):
+        index = CatalogIndex(os.path.join(self.dir, 'missing'))
+        self.assertTupleEqual(index.resolve(''), ('', ''))
+
+
+class TestForecastArchiveIndex(unittest.TestCase):
+    """
+    forecast archive index should resolve forecasts of a month in the order of the extension priorities.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        names = ['ETAS_2_8_2018.xml', 'ETAS_2_8_2018-fromXML.dat', 'ETAS_2_8_2018-fromXML.dat.meta',
+                 'ETAS_DR_2_8_2018-fromXML.xml', 'ETAS_DR_2_9_2018.xml']
+        for name in names:
+            open(os.path.join(self.dir, name), 'w').close()
+        self.date = datetime(2018, 2, 8)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_resolve_highest_priority(self):
+        index = ForecastArchiveIndex(self.dir)
+        self.assertEqual(index.resolve('ETAS', self.date), os.path.join(self.dir, 'ETAS_2_8_2018-fromXML.dat'))
+        self.assertEqual(index.resolve('ETAS_DR', self.date), os.path.join(self.dir, 'ETAS_DR_2_8_2018-fromXML.xml'))
+
+    def test_resolve_missing_forecast(self):
+        index = ForecastArchiveIndex(self.dir)
+        self.assertIsNone(index.resolve('ETAS_DRPPE', self.date))
+        self.assertIsNone(index.resolve('ETAS_2_8_2018-fromXML', self.date))
+        self.assertIsNone(ForecastArchiveIndex(os.path.join(self.dir, 'missing')).resolve('ETAS', self.date))
+
+
+class TestEvaluationResultIndex(unittest.TestCase):
+    """
+    evaluation result index should resolve result files of a day by test, forecast and date.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        names = ['rTest_N-Test_ETAS_2_8_2018-fromXML0.xml', 'rTest_N-Test_ETAS_2_8_2018-fromXML0.xml.meta',
+                 'rTest_CL-Test_ETAS_DR_2_8_2018-fromXML0.xml', 'rTest_N-Test_ETAS_2_18_2018-fromXML0.xml']
+        for name in names:
+            open(os.path.join(self.dir, name), 'w').close()
+        self.date = datetime(2018, 2, 8)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_resolve(self):
+        index = EvaluationResultIndex(self.dir)
+        self.assertEqual(index.resolve('N', 'ETAS', self.date),
+                         os.path.join(self.dir, 'rTest_N-Test_ETAS_2_8_2018-fromXML0.xml'))
+        # test names match the end of the prefix, same as the pattern used before
+        self.assertEqual(index.resolve('L', 'ETAS_DR', self.date),
+                         os.path.join(self.dir, 'rTest_CL-Test_ETAS_DR_2_8_2018-fromXML0.xml'))
+
+    def test_resolve_missing_result(self):
+        index = EvaluationResultIndex(self.dir)
+        self.assertEqual(index.resolve('L', 'ETAS', self.date), '')
+        self.assertEqual(index.resolve('N', 'ETAS', datetime(2018, 2, 1)), '')
+        missing = EvaluationResultIndex(os.path.join(self.dir, 'missing'))
+        self.assertFalse(missing.exists)
+        self.assertEqual(missing.resolve('N', 'ETAS', self.date), '')
+
+
+class TestMetaFile(unittest.TestCase):
+    """
+    meta files should be read once and scanned for every key in a single pass.
+    """
+    text = ("# ETAS-fromXML.xml\n"
+            "CreationDateTime = 2018-02-08T01:00:00\n"
+            "args '--waitingPeriod=31' '--runtimeTestDate=2018-02-08' '--logFile=/logs/run.log'\n"
+            "runtimeDirectory=/runtime/2018-02-08'\n")
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'ETAS_2_8_2018-fromXML.xml.meta')
+        with open(self.path, 'w') as f:
+            f.write(self.text)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_parse_text(self):
+        self.assertDictEqual(parse_text(self.text), {'type': 'ETAS-fromXML.xml',
+                                                     'CreationDateTime': '2018-02-08T01:00:00',
+                                                     'waitingPeriod': '31',
+                                                     'runtimeTestDate': '2018-02-08',
+                                                     'logFile': '/logs/run.log',
+                                                     'runtimeDirectory': '/runtime/2018-02-08'})
+
+    def test_parse_text_missing_keys(self):
+        self.assertDictEqual(parse_text('# catalog.nodecl.dat\n'), {'type': 'catalog.nodecl.dat'})
+
+    def test_parse_cached_until_modified(self):
+        cache = MetaFileCache()
+        self.assertIs(cache.parse(self.path), cache.parse(self.path))
+        self.assertEqual(cache.misses, 1)
+        with open(self.path, 'a') as f:
+            f.write("args '--logFile=/logs/other.log'\n")
+        self.assertEqual(cache.parse(self.path)['logFile'], '/logs/run.log')
+        self.assertEqual(cache.misses, 2)
+
+    def test_parse_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            MetaFileCache().parse(os.path.join(self.dir, 'missing.meta'))
+
+
+class TestForecastNameCatalog(unittest.TestCase):
+    """
+    forecast names should be read from the stored catalog, listing only new or changed archive directories.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.forecast_dir = os.path.join(self.dir, 'forecasts')
+        self.path = os.path.join(self.dir, 'catalog.json')
+        self.mtime = 0
+        self._month('2018_1', ['ETAS_1_1_2018-fromXML.xml', 'ETAS_1_1_2018-fromXML.xml.meta', 'STEP_1_1_2018.xml'])
+        self._month('2018_2', ['K3Md3_2_1_2018.dat', 'scec.csep.K3Md3_2_1_2018.dat'])
+        # any file not named like a forecast hides the whole directory
+        self._month('2018_3', ['KJSSOneDay_3_1_2018.xml', 'README'])
+        os.utime(self.forecast_dir, (0, 0))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _month(self, month, names):
+        month_dir = os.path.join(self.forecast_dir, 'archive', month)
+        os.makedirs(month_dir, exist_ok=True)
+        for name in names:
+            open(os.path.join(month_dir, name), 'w').close()
+        # older than the resolution of the modification time
+        self.mtime += 1
+        for path in (month_dir, os.path.dirname(month_dir)):
+            os.utime(path, (self.mtime, self.mtime))
+
+    def test_names(self):
+        names = ForecastNameCatalog(self.forecast_dir, self.path).names()
+        self.assertListEqual(sorted(names), ['ETAS', 'K3Md3', 'STEP'])
+
+    def test_stored_catalog_lists_new_directories(self):
+        ForecastNameCatalog(self.forecast_dir, self.path).names()
+        self._month('2018_4', ['KJSSOneDay_4_1_2018.xml'])
+        catalog = ForecastNameCatalog(self.forecast_dir, self.path)
+        self.assertIn('KJSSOneDay', catalog.names())
+        # the archive directory and the new month
+        self.assertEqual(catalog.listed, 2)
+        catalog.names(rescan=True)
+        self.assertEqual(catalog.listed, 6)
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    a snapshot manifest should answer directory listings, stats and meta files like the live filesystem.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.tree = os.path.join(self.dir, 'results')
+        os.makedirs(os.path.join(self.tree, '2018-02-08'))
+        self.result = os.path.join(self.tree, '2018-02-08', 'rELM_N-Test_ETAS_2_8_2018.xml')
+        with open(self.result, 'w') as f:
+            f.write('<result/>')
+        with open(self.result + '.meta', 'w') as f:
+            f.write("# N-Test\nCreationDateTime = 2018-02-08T01:00:00\n")
+        self.manifest = os.path.join(self.dir, 'manifest.sql3')
+        conn = sqlite3.connect(self.manifest)
+        conn.executescript(manifest_schema)
+        Crawler(conn).add_tree(self.tree)
+        conn.commit()
+        conn.close()
+        self.snapshot = Snapshot(self.manifest)
+
+    def tearDown(self):
+        fs.use(None)
+        shutil.rmtree(self.dir)
+
+    def test_matches_live_filesystem(self):
+        day = os.path.join(self.tree, '2018-02-08')
+        with self.snapshot.scandir(day) as entries:
+            self.assertSetEqual(set(entry.name for entry in entries), set(os.listdir(day)))
+        self.assertEqual(self.snapshot.stat(self.result).st_size, os.stat(self.result).st_size)
+        self.assertEqual(self.snapshot.stat(day).st_mtime_ns, os.stat(day).st_mtime_ns)
+        self.assertEqual(self.snapshot.meta(self.result + '.meta')['CreationDateTime'], '2018-02-08T01:00:00')
+
+    def test_offline(self):
+        fs.use(self.snapshot)
+        shutil.rmtree(self.tree)
+        cache = DirectoryCache(ttl=0)
+        self.assertIn(os.path.basename(self.result), cache.listing(os.path.dirname(self.result)).files)
+        self.assertEqual(MetaFileCache().parse(self.result + '.meta')['type'], 'N-Test')
+        with self.assertRaises(FileNotFoundError):
+            cache.listing(os.path.join(self.tree, '2018-02-09'))
+
+
+class TestProfiler(unittest.TestCase):
+    """
+    nested phases should not count the time of inner phases twice, and stats of workers should add up.
+    """
+    def test_nested_phases(self):
+        profiler = Profiler()
+        profiler.group = 'one-day-models'
+        profiler.enter('evaluations')
+        profiler.enter('catalogs')
+        profiler.count('read', nbytes=100)
+        profiler.exit()
+        profiler.exit()
+        evaluations = profiler.phases[('one-day-models', 'evaluations')]
+        catalogs = profiler.phases[('one-day-models', 'catalogs')]
+        self.assertListEqual([evaluations[0], evaluations[2]], [1, 0])
+        self.assertListEqual([catalogs[0], catalogs[2]], [1, 100])
+        self.assertEqual(profiler.syscalls[('one-day-models', 'read')], 1)
+
+    def test_merge(self):
+        worker = Profiler()
+        worker.count('stat')
+        profiler = Profiler()
+        profiler.count('stat')
+        profiler.merge(worker.drain())
+        profiler.merge(worker.drain())
+        self.assertEqual(profiler.syscalls[('', 'stat')], 2)
+        self.assertDictEqual(worker.syscalls, {})
+
+    def test_tagged_thread(self):
+        """ bytes read by a tagged thread should be counted for its phase """
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+
+        def read():
+            profiling.tag_thread('prefetch')
+            profiling.count('read', 10)
+
+        with profiling.phase('evaluations'):
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join()
+            profiling.count('read', 5)
+        phases, syscalls = profiling.drain()
+        self.assertEqual(phases[('', 'evaluations')][2], 5)
+        self.assertEqual(phases[('', 'prefetch')][2], 10)
+        self.assertEqual(syscalls[('', 'read')], 2)
+
+
+class TestPrefetcher(unittest.TestCase):
+    """
+    prefetching should leave listings, meta files and stat results of the requested directories in the caches.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name in ('rTest_N-Test_ETAS_1_2_2018-fromXML.xml', 'rTest_N-Test_ETAS_1_2_2018-fromXML.xml.meta',
+                     'plot.svg'):
+            with open(os.path.join(self.dir, name), 'w') as f:
+                f.write('# {}\nCreationDateTime = 2018-01-03T02:00:00\n'.format(name))
+        self.prefetcher = Prefetcher(threads=2, in_flight=1, lookahead=1)
+
+    def tearDown(self):
+        self.prefetcher.close()
+        dircache.invalidate()
+        shutil.rmtree(self.dir)
+
+    def test_prefetched(self):
+        requests = [Request(self.dir, EvaluationResultIndex.result_pattern), Request(os.path.join(self.dir, 'missing'))]
+        items = list(self.prefetcher.prefetched(range(3), lambda item: requests))
+        self.assertEqual(items, [0, 1, 2])
+        # two listings, one meta file and one result file, later items request the same directories
+        self.assertEqual(self.prefetcher.calls, 4)
+        listing = dircache.listing(self.dir)
+        self.assertIsNotNone(listing.entries['rTest_N-Test_ETAS_1_2_2018-fromXML.xml']._stat)
+        self.assertIsNone(listing.entries['plot.svg']._stat)
+
+    def test_reads_counted_for_prefetch(self):
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+        with profiling.phase('evaluations'):
+            self.prefetcher.submit([Request(self.dir)]).result()
+        phases, syscalls = profiling.drain()
+        self.assertEqual(phases[('', 'evaluations')][2], 0)
+        self.assertGreater(phases[('', 'prefetch')][2], 0)
+
+
+class TestSynthetic(unittest.TestCase):
+    """
+    synthetic testing centers should be laid out like CSEP and be the same for the same parameters.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.parameters = Parameters(days=90, groups=2, models=2, tests=2, missing=0.2,
+                                     start_date=datetime(2015, 12, 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _tree(self, root):
+        return sorted(os.path.relpath(os.path.join(path, name), root)
+                      for path, dirs, names in os.walk(root) for name in names)
+
+    def test_layout(self):
+        scripts = Generator(self.dir, self.parameters).generate()
+        self.assertEqual(len(scripts), 1)
+        with open(scripts[0]) as f:
+            self.assertIn('--waitingPeriod=31', f.read())
+        group_path = os.path.join(self.dir, 'operations', 'one-day-models-V2')
+        self.assertTrue(os.path.isfile(os.path.join(group_path, 'forecast.init.xml')))
+        # the second group starts 30 days after the first, and both end after 90 days
+        self.assertListEqual(sorted(os.listdir(os.path.join(group_path, 'forecasts', 'archive'))),
+                             ['2015_12', '2016_1', '2016_2'])
+        self.assertLess(max(os.listdir(os.path.join(group_path, 'results'))), '2016-02-29')
+
+    def test_reproducible(self):
+        other = os.path.join(self.dir, 'other')
+        Generator(os.path.join(self.dir, 'one'), self.parameters).generate()
+        Generator(other, self.parameters).generate()
+        self.assertListEqual(self._tree(os.path.join(self.dir, 'one')), self._tree(other))
+
+
+class TestForecastGroups(unittest.TestCase):
+    """
+    forecast groups should only parse their config and list their forecast archive once a field needs it.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        Generator(self.dir, Parameters(days=3, groups=1, models=2, missing=0)).generate()
+        self.group_path = os.path.join(self.dir, 'operations', 'one-day-models-V1')
+        self.cache_dir = forecastnames.cache_dir
+        forecastnames.configure(None)
+        configs.clear()
+
+    def tearDown(self):
+        forecastnames.configure(self.cache_dir)
+        configs.clear()
+        dircache.invalidate()
+        shutil.rmtree(self.dir)
+
+    def test_lazy_attributes(self):
+        group = ForecastGroups(self.group_path)
+        self.assertEqual(group.group_dir, 'one-day-models-V1')
+        self.assertIsNone(group._config)
+        self.assertListEqual(group.models, ['ETAS', 'STEP'])
+        self.assertEqual(group.result_dir, os.path.join(self.group_path, 'results'))
+        self.assertEqual(group.entry_date, datetime(2015, 1, 1))
+        # the archive is only listed for the forecasts
+        self.assertIsNone(group._expected_forecasts)
+        self.assertEqual(set(group.expected_forecasts), {'ETAS', 'STEP'})
+        self.assertIsNotNone(group._expected_forecasts)
+
+    def test_without_path(self):
+        group = ForecastGroups('', group_name='OneDay')
+        self.assertEqual(group.group_name, 'OneDay')
+        self.assertListEqual(group.models, [])
+        self.assertListEqual(group.expected_forecasts, [])
+        self.assertIsNone(group.entry_date)
+
+
+class TestSession(unittest.TestCase):
+    """
+    sessions should let readers query the database during a write, and commit in batches.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, 'test_db')
+        db = connect(self.db_path)
+        db.execute("CREATE TABLE Catalogs (catalog_id INTEGER PRIMARY KEY, data_filename TEXT NOT NULL)")
+        db.commit()
+        db.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_read_during_write(self):
+        db = connect(self.db_path)
+        self.assertEqual(db.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        db.execute("INSERT INTO Catalogs (data_filename) VALUES ('catalog.nodecl.dat')")
+        # write transaction is still open, reader does not wait for the lock
+        reader = connect(self.db_path, timeout=0)
+        self.assertEqual(reader.execute("SELECT count(*) FROM Catalogs").fetchone()[0], 0)
+        db.commit()
+        self.assertEqual(reader.execute("SELECT count(*) FROM Catalogs").fetchone()[0], 1)
+
+    def test_commit_size(self):
+        db = connect(self.db_path)
+        inserter = BulkInserter(db)
+        session = Session(db, inserter, commit_size=3)
+        for i in range(7):
+            inserter.add('Catalogs', {'data_filename': 'catalog{}.dat'.format(i)})
+            session.written()
+        session.group_done()
+        self.assertEqual(session.commits, 2)
+        reader = connect(self.db_path)
+        self.assertEqual(reader.execute("SELECT count(*) FROM Catalogs").fetchone()[0], 6)
+
+
+class TestLoad(unittest.TestCase):
+    """
+    the loader should stream csv files into their tables and apply the conflict policy to repeated rows.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, 'test_db')
+        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'testing_data')
+        create_schema(os.path.join(data_dir, '..', 'table_schema.txt'), self.db_path).close()
+        self.tables = {'Dispatchers': os.path.join(data_dir, 'dispatchers.csv'),
+                       'Dispatchers_ForecastGroups': os.path.join(data_dir, 'dispatchers_forecastgroups.csv')}
+        self.chunk_size = load.chunk_size
+        load.chunk_size = 4
+
+    def tearDown(self):
+        load.chunk_size = self.chunk_size
+        shutil.rmtree(self.dir)
+
+    def test_load_data(self):
+        summaries = load.load_data(self.db_path, self.tables, ['Dispatchers_ForecastGroups'])
+        self.assertEqual([(s.table, s.rows, s.inserted, s.skipped) for s in summaries],
+                         [('Dispatchers', 6, 6, 0), ('Dispatchers_ForecastGroups', 6, 6, 0)])
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("SELECT script_name FROM Dispatchers WHERE dispatcher_id=1").fetchone()[0],
+                         'dispatcher_script1.tcsh')
+
+    def test_policies(self):
+        load.load_data(self.db_path, self.tables, ['Dispatchers_ForecastGroups'])
+        tables = {'Dispatchers_ForecastGroups': self.tables['Dispatchers_ForecastGroups']}
+        summary, = load.load_data(self.db_path, tables, tables, 'ignore')
+        self.assertEqual((summary.inserted, summary.updated, summary.skipped), (0, 0, 6))
+        summary, = load.load_data(self.db_path, tables, tables, 'replace')
+        self.assertEqual((summary.inserted, summary.updated, summary.skipped), (0, 6, 0))
+        # the whole table is rolled back
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DELETE FROM Dispatchers_ForecastGroups WHERE dispatcher_id=1 AND group_id=1")
+        conn.commit()
+        with self.assertRaises(sqlite3.IntegrityError):
+            load.load_data(self.db_path, tables, tables, 'abort')
+        self.assertEqual(conn.execute("SELECT count(*) FROM Dispatchers_ForecastGroups").fetchone()[0], 5)
+        with self.assertRaises(ValueError):
+            load.load_data(self.db_path, tables, tables, 'merge')
+
+    def test_summary_triggers(self):
+        """ rows written by the summary triggers should not be counted as loaded rows """
+        conn = create_schema('db_schema.sql', os.path.join(self.dir, 'triggers_db'))
+        conn.execute("INSERT INTO Schedules (date_time) VALUES ('2018-01-02 00:00:00')")
+        conn.execute("INSERT INTO Dispatchers (script_name, config_file_name) VALUES ('dispatcher.tcsh', 'init.xml')")
+        conn.execute("INSERT INTO ForecastGroups (group_name, group_path, config_filepath, dispatcher_id) "
+                     "VALUES ('one-day-models', '/operations/one-day-models', 'forecast.init.xml', 1)")
+        conn.commit()
+        fields = ['schedule_id', 'group_id', 'name', 'filepath', 'status']
+        rows = [(1, 1, name, name + '.xml', 'Complete') for name in ('ETAS', 'STEP', 'KJSS', 'TripleS', 'BMA')]
+
+        summary = load.load_rows(conn, 'Forecasts', fields, rows)
+        self.assertEqual((summary.rows, summary.inserted, summary.updated, summary.skipped), (5, 5, 0, 0))
+        summary = load.load_rows(conn, 'Forecasts', fields, rows, 'ignore')
+        self.assertEqual((summary.inserted, summary.updated, summary.skipped), (0, 0, 5))
+        missing = [row[:4] + ('Missing',) for row in rows]
+        summary = load.load_rows(conn, 'Forecasts', fields, missing, 'update')
+        self.assertEqual((summary.inserted, summary.updated, summary.skipped), (0, 5, 0))
+        # the triggers did write the summaries
+        self.assertListEqual(conn.execute("SELECT status, sum(count) FROM ForecastStatusCounts GROUP BY status "
+                                          "HAVING sum(count) != 0").fetchall(), [('Missing', 5)])
+        summary = load.load_rows(conn, 'Forecasts', fields, rows, 'replace')
+        self.assertEqual((summary.inserted, summary.updated, summary.skipped), (0, 5, 0))
+        conn.close()
+
+
+class TestIndexes(unittest.TestCase):
+    """
+    secondary indexes should be dropped for loading and used by the status queries once built.
+    """
+    def setUp(self):
+        self.db = create_schema('db_schema.sql', 'test_db')
+
+    def tearDown(self):
+        self.db.close()
+        os.remove('test_db')
+
+    def _indexes(self):
+        cursor = self.db.execute("select name from sqlite_master where type='index' and sql is not null")
+        return set(row[0] for row in cursor)
+
+    def test_drop_and_create_indexes(self):
+        create_indexes('db_indexes.sql', self.db)
+        self.assertIn('forecasts_status_name', self._indexes())
+        drop_indexes('db_indexes.sql', self.db)
+        self.assertSetEqual(self._indexes(), set())
+
+    def test_status_query_uses_covering_index(self):
+        create_indexes('db_indexes.sql', self.db)
+        plan = self.db.execute("explain query plan select name, count(rowid) from Forecasts "
+                               "where status='Missing' group by name").fetchall()
+        self.assertIn('COVERING INDEX forecasts_status_name', plan[0][-1])
+
+
+class TestSummaries(unittest.TestCase):
+    """
+    status summaries should follow inserts, status updates and deletes of forecasts and evaluations.
+    """
+    def setUp(self):
+        self.db = create_schema('db_schema.sql', 'test_db')
+        cursor = self.db.cursor()
+        cursor.executemany("insert into Schedules (date_time) values (?)", [('2018-02-07',), ('2018-03-01',)])
+        cursor.execute("insert into Dispatchers (script_name, config_file_name) values ('dispatcher.tcsh', 'init.xml')")
+        cursor.execute("insert into ForecastGroups (group_name, group_path, config_filepath, dispatcher_id) "
+                       "values ('one-day-models', '/groups/one-day-models', 'forecast.init.xml', 1)")
+        cursor.executemany("insert into Forecasts (schedule_id, group_id, name, filepath, status) values (?, 1, ?, ?, ?)",
+                           [(1, 'ETAS', 'a', 'Complete'), (2, 'ETAS', 'b', 'Missing'), (1, 'STEP', 'c', 'Missing')])
+        cursor.executemany("insert into Evaluations (schedule_id, forecast_id, name, status) values (?, ?, ?, ?)",
+                           [(1, 1, 'N', 'Complete'), (1, 1, 'L', 'Missing'), (2, 2, 'N', 'Scheduled')])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        os.remove('test_db')
+
+    def _counts(self):
+        return (self.db.execute("select * from ForecastStatusCounts where count > 0 order by 1, 2, 3, 4").fetchall(),
+                self.db.execute("select * from EvaluationStatusCounts where count > 0 order by 1, 2, 3, 4, 5").fetchall())
+
+    def test_counts_follow_inserts(self):
+        self.assertListEqual(summaries.forecast_counts(self.db), [('ETAS', 1), ('STEP', 1)])
+        self.assertListEqual(summaries.evaluation_counts(self.db), [('ETAS', 'L', 1), ('ETAS', 'N', 0)])
+        self.assertListEqual(summaries.group_completion(self.db), [('one-day-models', '2018-02', 1, 2, 1, 2),
+                                                                   ('one-day-models', '2018-03', 0, 1, 0, 0)])
+
+    def test_counts_follow_updates_and_deletes(self):
+        self.db.execute("update Evaluations set status='Complete' where name='L'")
+        self.assertListEqual(summaries.evaluation_counts(self.db, status='Complete'), [('ETAS', 'L', 1), ('ETAS', 'N', 1)])
+        self.db.execute("delete from Evaluations where forecast_id=2")
+        self.db.execute("delete from Forecasts where filepath='b'")
+        self.assertListEqual(summaries.forecast_counts(self.db), [('ETAS', 0), ('STEP', 1)])
+
+    def test_rebuild(self):
+        self.db.execute("update Forecasts set status='Complete' where name='STEP'")
+        counts = self._counts()
+        summaries.rebuild(self.db)
+        self.assertTupleEqual(self._counts(), counts)
+        self.assertFalse(summaries.is_stale(self.db))
+
+
+class TestStatusClassifier(unittest.TestCase):
+    """
+    missing products should be scheduled until their waiting period has passed, relative to a single time.
+    """
+    def setUp(self):
+        self.classifier = StatusClassifier(datetime(2018, 3, 10, 12, 0, 0))
+
+    def test_is_scheduled(self):
+        self.assertTrue(self.classifier.is_scheduled(datetime(2018, 3, 10), '1'))
+        self.assertFalse(self.classifier.is_scheduled(datetime(2018, 3, 9), '1'))
+        self.assertTrue(self.classifier.is_scheduled(datetime(2018, 3, 9), '2'))
+        # evaluations use one day less than the waiting period of the forecast
+        self.assertFalse(self.classifier.is_scheduled(datetime(2018, 3, 9), '2', offset=-1))
+
+    def test_status(self):
+        dates = [datetime(2018, 3, 1), datetime(2018, 3, 1), datetime(2018, 3, 10), datetime(2018, 3, 10)]
+        statuses = [self.classifier.status(date, exists, '1')
+                    for date, exists in zip(dates, [True, False, False, True])]
+        self.assertListEqual(statuses, ['Complete', 'Missing', 'Scheduled', 'Complete'])
+        statuses = [self.classifier.status(date, exists, 31, present='Present')
+                    for date, exists in zip(dates[:2], [True, False])]
+        self.assertListEqual(statuses, ['Present', 'Scheduled'])
+        # the waiting period of existing products is not needed
+        self.assertEqual(self.classifier.status(dates[0], True, None), 'Complete')
+
+    def test_classify(self):
+        dates = [datetime(2018, 3, 1), datetime(2018, 3, 9), datetime(2018, 3, 10), datetime(2018, 3, 10),
+                 datetime(2018, 3, 1)]
+        found = [True, False, False, True, False]
+        waiting_periods = [None, '2', '1', '1', 31]
+        for offset, present in ((0, 'Complete'), (-1, 'Present')):
+            statuses = self.classifier.classify(dates, found, waiting_periods, offset=offset, present=present)
+            self.assertListEqual(statuses, [self.classifier.status(date, exists, waiting_period, offset, present)
+                                            for date, exists, waiting_period in zip(dates, found, waiting_periods)])
+        self.assertListEqual(self.classifier.classify(dates, found, waiting_periods),
+                             ['Complete', 'Scheduled', 'Scheduled', 'Complete', 'Scheduled'])
+
+
+class TestSchedule(unittest.TestCase):
+    """
+    schedules should be compiled from the forecast group config file, and end at the end date.
+    """
+    class Weekly:
+        """ stands in for CSEPSchedule """
+        def has(self, date):
+            return date.weekday() == 0
+
+    def test_daily_without_schedules(self):
+        schedule = Schedule(datetime(2018, 2, 26), [None], end_date=datetime(2018, 3, 3, 12, 0, 0))
+        self.assertEqual(len(schedule.dates()), 6)
+        self.assertEqual(schedule.dates()[-1], datetime(2018, 3, 3))
+
+    def test_compiled_from_schedules(self):
+        schedule = Schedule(datetime(2018, 2, 1), [self.Weekly()], end_date=datetime(2018, 3, 1))
+        self.assertListEqual(schedule.dates(), [datetime(2018, 2, day) for day in (5, 12, 19, 26)])
+        self.assertTrue(schedule.has(datetime(2018, 2, 12)))
+        self.assertFalse(schedule.has(datetime(2018, 2, 13)))
+
+    def test_without_start_date(self):
+        self.assertListEqual(Schedule(None).dates(), [])
+
+
+class TestConfigs(unittest.TestCase):
+    """
+    dispatcher scripts should be parsed once, and again only after the script or its init file changed.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.init_file = os.path.join(self.dir, 'dispatcher.init.xml')
+        self.script = os.path.join(self.dir, 'dispatcher.tcsh')
+        self._write_init_file('/home/csep/operations/one-day-models')
+        with open(self.script, 'w') as f:
+            f.write("#!/bin/tcsh\npython Dispatcher.py --configFile={} --waitingPeriod=31\n".format(self.init_file))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _write_init_file(self, *group_paths):
+        with open(self.init_file, 'w') as f:
+            f.write('<CSEPInitFile>{}</CSEPInitFile>'.format(
+                ''.join('<forecastGroup>{}</forecastGroup>'.format(path) for path in group_paths)))
+
+    def test_parse_dispatcher(self):
+        config = parse_dispatcher(self.script)
+        self.assertEqual(config.config_file_name, self.init_file)
+        self.assertEqual(config.waiting_period, 31)
+        self.assertTupleEqual(config.group_paths, ('/home/csep/operations/one-day-models',))
+
+    def test_cached_until_init_file_modified(self):
+        cache = ConfigCache(parse_dispatcher, lambda config: (config.script_name, config.config_file_name))
+        self.assertIs(cache.load(self.script), cache.load(self.script))
+        self.assertEqual(cache.misses, 1)
+        self._write_init_file('/home/csep/operations/one-day-models', '/home/csep/operations/one-day-models-V2')
+        stat = os.stat(self.init_file)
+        os.utime(self.init_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        self.assertEqual(len(cache.load(self.script).group_paths), 2)
+        self.assertEqual(cache.misses, 2)
+
+
+class TestExtraction(unittest.TestCase):
+    """
+    extractions of a synthetic testing center should keep every scheduled forecast.
+    """
+    class Weekly:
+        """ stands in for CSEPSchedule """
+        def has(self, date):
+            return date.weekday() == 0
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        # starts on a monday
+        self.parameters = Parameters(days=14, groups=1, models=2, tests=2, missing=0, start_date=datetime(2018, 1, 1))
+        self.scripts = Generator(os.path.join(self.dir, 'tree'), self.parameters).generate()
+        self.cache_dir = forecastnames.cache_dir
+        forecastnames.configure(None)
+        configs.clear()
+        patcher = mock.patch.object(ForecastGroups, 'end_date', self.parameters.end_date)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        forecastnames.configure(self.cache_dir)
+        configs.clear()
+        dircache.invalidate()
+        shutil.rmtree(self.dir)
+
+    def _extract(self, name, **kwargs):
+        db = create_schema('db_schema.sql', os.path.join(self.dir, name))
+        extract(db, BulkInserter(db), self.scripts, index_statements='db_indexes.sql',
+                trigger_statements='db_schema.sql', **kwargs)
+        return db
+
+    @staticmethod
+    def _count(db, table):
+        return db.execute('select count(*) from {}'.format(table)).fetchone()[0]
+
+    @staticmethod
+    def _dump(db):
+        # the time of the scan is the only value differing between extractions
+        db.execute('update ScanStates set scan_datetime = null')
+        tables = [row[0] for row in db.execute("select name from sqlite_master where type = 'table' order by name")]
+        return {table: db.execute('select * from {} order by 1'.format(table)).fetchall() for table in tables}
+
+    def test_workers_write_same_tables(self):
+        """ extracting with worker processes should write the same rows as scanning in this process """
+        serial = self._extract('serial.sql3', workers=1)
+        parallel = self._extract('parallel.sql3', workers=2)
+        self.assertGreater(self._count(serial, 'Evaluations'), 0)
+        self.assertDictEqual(self._dump(parallel), self._dump(serial))
+
+    def test_forecasts_outside_evaluation_schedule(self):
+        with mock.patch.object(ForecastGroups, 'evaluation_schedule', (self.Weekly(),)):
+            db = self._extract('weekly.sql3')
+        # every day of the models schedule, evaluations only on mondays
+        self.assertEqual(self._count(db, 'Forecasts'), 14 * 2)
+        self.assertEqual(self._count(db, 'Evaluations'), 2 * 2 * 2)
+        self.assertEqual(self._count(db, 'Schedules'), 14)
+        db.close()
+
+    def test_group_generators_match_lists(self):
+        """ streamed forecasts and evaluations should match building every forecast for each evaluation """
+        dispatcher = Dispatchers(self.scripts[0])
+        group_path = next(iter(dispatcher.group_paths()))
+        # a day without result directory, its evaluations are missing
+        shutil.rmtree(os.path.join(group_path, 'results', '2018-01-03'))
+        group = ForecastGroups(group_path, dispatcher, status_classifier=StatusClassifier())
+
+        # the evaluations of the first day are yielded before the next day is read
+        evaluations = group.evaluations()
+        first = next(evaluations)
+        self.assertListEqual(list(group._result_indexes), ['2018-01-01'])
+
+        def forecast_values(forecast):
+            return forecast.schedule_id.start_date, forecast.name, forecast.filepath, forecast.status
+
+        def evaluation_values(evaluation):
+            return evaluation.date, evaluation.name, evaluation.forecast_name, evaluation.filepath, evaluation.status
+
+        expected_forecasts = []
+        expected_evaluations = []
+        for schedule in list(group.schedule()):
+            forecasts = [Forecasts(schedule, group, name, group.forecast_dir) for name in group.expected_forecasts]
+            expected_forecasts.extend(forecast_values(forecast) for forecast in forecasts)
+            for test in group.evaluation_tests:
+                expected_evaluations.extend(evaluation_values(Evaluations(schedule, forecast, group.result_dir, test))
+                                            for forecast in forecasts)
+
+        self.assertListEqual([forecast_values(forecast) for forecast in group.forecasts()], expected_forecasts)
+        streamed = [evaluation_values(first)] + [evaluation_values(evaluation) for evaluation in evaluations]
+        self.assertListEqual(streamed, expected_evaluations)
+        self.assertEqual(len(streamed), 14 * len(group.evaluation_tests) * len(group.expected_forecasts))
+        missing = [values[4] for values in streamed if values[0] == datetime(2018, 1, 3)]
+        self.assertListEqual(missing, ['Missing'] * len(group.evaluation_tests) * len(group.expected_forecasts))
+
+    def test_statuses_against_now(self):
+        """ missing evaluations should be scheduled until their waiting period has passed, relative to now """
+        result_dir = os.path.join(self.dir, 'tree', 'operations', 'one-day-models-V1', 'results', '2018-01-14')
+        os.remove(os.path.join(result_dir, sorted(name for name in os.listdir(result_dir)
+                                                  if name.endswith('.xml'))[0]))
+        statuses = "select status, count(*) from Evaluations where status != 'Complete' group by status"
+        db = self._extract('now.sql3', now=self.parameters.end_date)
+        self.assertListEqual(db.execute(statuses).fetchall(), [('Scheduled', 1)])
+        db.close()
+        db = self._extract('today.sql3')
+        self.assertListEqual(db.execute(statuses).fetchall(), [('Missing', 1)])
+        db.close()
+
+    def test_indexes_restored_after_failure(self):
+        with mock.patch.object(Writer, 'write', side_effect=RuntimeError('write failed')):
+            with self.assertRaises(RuntimeError):
+                self._extract('failed.sql3')
+        db = sqlite3.connect(os.path.join(self.dir, 'failed.sql3'))
+        indexes = set(row[0] for row in db.execute("select name from sqlite_master where type='index'"))
+        self.assertTrue(set(index_names('db_indexes.sql')) <= indexes)
+        db.close()
+
+    def test_restore_failure_keeps_original_error(self):
+        with mock.patch.object(Writer, 'write', side_effect=RuntimeError('write failed')), \
+                mock.patch.object(summaries, 'rebuild', side_effect=sqlite3.OperationalError('rebuild failed')):
+            with self.assertRaises(RuntimeError):
+                self._extract('failed.sql3')
+
+    def _summaries(self, db):
+        return (db.execute('select * from ForecastStatusCounts order by 1, 2, 3, 4').fetchall(),
+                db.execute('select * from EvaluationStatusCounts order by 1, 2, 3, 4, 5').fetchall())
+
+    def test_incremental_keeps_triggers(self):
+        self._extract('incremental.sql3').close()
+        # one result of the second day disappears
+        result_dir = os.path.join(self.dir, 'tree', 'operations', 'one-day-models-V1', 'results', '2018-01-02')
+        os.remove(os.path.join(result_dir, 'rTest_N-Test_ETAS_1_2_2018-fromXML.xml'))
+        os.utime(result_dir, ns=(0, 0))
+        dircache.invalidate()
+        with mock.patch.object(summaries, 'rebuild', wraps=summaries.rebuild) as rebuild:
+            db = self._extract('incremental.sql3', incremental=True)
+        rebuild.assert_not_called()
+        triggers = db.execute("select count(*) from sqlite_master where type='trigger'").fetchone()[0]
+        self.assertEqual(triggers, 6)
+        counted = self._summaries(db)
+        self.assertIn((1, 'ETAS', 'N', '2018-01', 'Missing', 1), counted[1])
+        summaries.rebuild(db)
+        self.assertEqual(counted, self._summaries(db))
+        db.close()
+
+    def test_incremental_keeps_indexes(self):
+        db = self._extract('indexes.sql3')
+        db.execute('drop index forecasts_schedule')
+        db.commit()
+        db.close()
+        with mock.patch('extraction.drop_indexes') as drop, \
+                mock.patch('extraction.create_indexes', wraps=create_indexes) as create:
+            db = self._extract('indexes.sql3', incremental=True)
+        drop.assert_not_called()
+        # missing indexes are created, without analyzing the whole tables again
+        create.assert_called_once_with('db_indexes.sql', db, analyze=False)
+        names = set(row[0] for row in db.execute("select name from sqlite_master where type = 'index'"))
+        self.assertTrue(set(index_names('db_indexes.sql')) <= names)
+        db.close()
+
+
 if __name__ == "__main__":
     unittest.main()